@@ -0,0 +1,23 @@
+"""
+URLs for sites running under ASGI. Include them instead of padman.urls to
+serve the views that mostly wait on the pad servers asynchronously. The
+other views stay synchronous.
+"""
+
+import django
+from django.urls import re_path
+from django.core.exceptions import ImproperlyConfigured
+
+if django.VERSION < (3, 1):
+    raise ImproperlyConfigured("The async views of padman require Django 3.1 or newer")
+
+from . import async_views, urls
+
+
+app_name = 'padman'
+urlpatterns = [
+    re_path(r'^pad/(?P<pk>\d+)/$', async_views.padView, name="pad"),
+    re_path(r'^pad/(?P<pk>\d+)/duplicate/$', async_views.padDuplicate, name="duplicate"),
+    re_path(r'^pad/(?P<pk>\d+)/raw/$', async_views.rawPadView, name="rawpad"),
+    re_path(r'^(?P<category>[A-Za-z0-9_-]+)/~search/$', async_views.groupSearch, name='groupsearch'),
+] + urls.urlpatterns
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Async variants of the views that mostly wait on the pad servers, for sites
+running under ASGI on Django 3.1 or newer (see async_urls). The database
+is accessed in a thread through sync_to_async, while the calls to the pad
+servers go through the asyncio clients of backend.aio, so waiting on them
+does not hold a worker thread.
+"""
+
+# Python imports
+import asyncio
+import datetime
+from urllib.parse import urlparse
+
+# Framework imports
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render
+from django.template import Context
+from django.utils.translation import ugettext_lazy as _
+from django.urls import reverse_lazy
+
+# local imports
+from . import models, pool, sessions, templating
+
+_render = sync_to_async(render)
+
+@sync_to_async
+def _get_pad(pk):
+    return get_object_or_404(models.Pad.objects.select_related('server', 'group'), pk=pk)
+
+@sync_to_async
+def _is_authenticated(request):
+    return request.user.is_authenticated
+
+
+async def update_request(request, pad_server, client):
+    """Like sessions.update_request, but calls the pad server
+    asynchronously. Returns the author of the current user.
+    """
+    author = await sync_to_async(models.PadAuthor.objects.current)(pad_server, request.user)
+    if author and await sync_to_async(pad_server.is_online)():
+        state, missing, stale = await sync_to_async(sessions.plan_sessions)(request, author)
+        if missing:
+            created = await client.create_sessions(missing, author.authorID, int(state['expires']))
+            created = sessions.created_sessions(created)
+            await sync_to_async(sessions.share_sessions)(author, created, state['expires'])
+            state['sessions'].update(created)
+        if stale:
+            await client.delete_sessions(list(stale.values()))
+            await sync_to_async(sessions.forget_sessions)(author, stale)
+        await sync_to_async(sessions.save_state)(request, pad_server, state)
+    return author
+
+
+async def padView(request, pk):
+    pad = await _get_pad(pk)
+    client = pad.server.async_client
+    author = await update_request(request, pad.server, client)
+
+    context = {
+        'object': pad,
+        'pad': pad,
+        'server': urlparse(pad.server.url),
+    }
+    if author:
+        allowed = await sync_to_async(lambda: pad.group.authors.filter(pk=author.pk).exists())()
+        if not allowed:
+            uname = await sync_to_async(lambda: str(author.user))()
+            context.update({
+                'link': await client.get_pad_link(pad.padid, uname),
+                'error': _('You are not allowed to view or edit this pad')
+            })
+            return await _render(request, 'padman/pad.html', context)
+
+    context.update({
+        'link': await client.get_pad_link(pad.padid, None),
+        'error': False
+    })
+
+    cookies = []
+    if author:
+        state = await sync_to_async(sessions.get_state)(request, pad.server)
+        if not state['expires']:
+            raise RuntimeError("PadServer not available")
+        session_id = state['sessions'].get(pad.group.groupID)
+        if session_id:
+            cookies.append({
+                'key': 'padSessionID',
+                'value': session_id,
+                'expires': datetime.datetime.utcfromtimestamp(state['expires']),
+                'httponly': False
+            })
+
+    response = await _render(request, 'padman/pad.html', context)
+    for cookie in cookies:
+        response.set_cookie(**cookie)
+    return await sync_to_async(sessions.update_response)(request, response, pad.server)
+
+
+async def rawPadView(request, pk):
+    pad = await _get_pad(pk)
+    text = await pad.server.async_client.get_text(pad.padid)
+    return await _render(request, 'padman/raw.html', {'object': pad, 'pad': pad, 'text': text})
+
+
+async def groupSearch(request, category):
+    if not await _is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    groups = await sync_to_async(list)(
+        models.PadGroup.objects.filter(group_mapper=category).select_related('server')
+    )
+    if not groups:
+        raise Http404("No such group")
+    pads = []
+
+    query = request.GET.get("query","")
+    if query:
+        # Search the groups of the category on all servers at once, and
+        # skip the servers that fail
+        searches = []
+        for group in groups:
+            search = getattr(group.server.async_client, 'search', None)
+            if search is not None:
+                searches.append(search(group.groupID, query))
+        results = [
+            result for found in await asyncio.gather(*searches, return_exceptions=True)
+            if not isinstance(found, Exception)
+            for result in found
+        ]
+        known = await sync_to_async(lambda: dict(
+            (pad.padid, pad) for pad in
+            models.Pad.objects.filter(padid__in=[result.get("pad") for result in results])
+        ))()
+        pads = [{
+            "pad": known.get(result.get("pad")),
+            "matches": result.get("matches"),
+        } for result in results]
+
+    con = {
+        'pads': pads,
+        'query': query,
+    }
+    return await _render(request, 'padman/group-search.html', con)
+
+
+async def padDuplicate(request, pk):
+    if not await _is_authenticated(request):
+        return redirect_to_login(request.get_full_path())
+    pad = await _get_pad(pk)
+    if not await sync_to_async(pad.group.is_member)(request.user):
+        raise PermissionDenied
+    date = datetime.datetime.now()
+
+    password = templating.render_field(pad.template_password, Context({}))
+    padname = templating.render_field(pad.template_padname, Context({"date": date }))
+    slug = templating.render_field(pad.template_slug, Context({"date": date }))
+
+    if pad.template_pool_size:
+        new_pad = await sync_to_async(pool.claim)(pad, padname, slug, password)
+        if new_pad:
+            return HttpResponseRedirect(reverse_lazy('padman:pad', args=[new_pad.pk]))
+
+    client = pad.server.async_client
+    template = await templating.async_pad_template(pad, client)
+    new_text = template.render(Context({
+        "password": password,
+        "date": date,
+        "name": padname,
+        "slug": slug
+    }))
+
+    padid = await client.create_group_pad(pad.group.groupID, padname, text=new_text)
+    if password:
+        await client.set_password(padid, password)
+    await client.set_public_status(padid, pad.template_is_public)
+
+    new_pad = models.Pad(
+        group=pad.group,
+        name=padname,
+        slug=slug,
+        server=pad.server,
+        padid=padid,
+        password=password,
+        is_public=pad.template_is_public,
+    )
+    await sync_to_async(new_pad.save)(remote=False)
+
+    return HttpResponseRedirect(reverse_lazy('padman:pad', args=[new_pad.pk]))
@@ -0,0 +1,269 @@
+"""
+asyncio implementations of the pad backends, used by the async views.
+
+The Etherpad Lite and HackMD backends talk to their servers through one
+pooled httpx.AsyncClient per server and event loop, so a single process
+can wait on thousands of calls at once. The connection pool doubles as the
+bulkhead of the server: calls that find no free connection within
+SERVER_QUEUE_TIMEOUT seconds fail with ServerBusy. Identical concurrent
+idempotent calls share one request. Other backends are adapted by running
+their synchronous methods in a thread.
+
+httpx is an optional dependency, only needed for the async views.
+"""
+
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+from . import base
+from .etherpadlite import EtherpadLiteBackend
+from .hackmd import clean_url
+from .. import config
+
+
+class _Server(object):
+    """Connection pool and in-flight calls of one server on one event loop
+    """
+
+    def __init__(self, **kwargs):
+        self.http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=config.ASYNC_SERVER_CONNECTIONS),
+            timeout=httpx.Timeout(20, pool=config.SERVER_QUEUE_TIMEOUT),
+            **kwargs
+        )
+        self.calls = {}
+        self.logged_in = None
+
+    async def request(self, method, url, **kwargs):
+        try:
+            return await self.http.request(method, url, **kwargs)
+        except httpx.PoolTimeout:
+            raise base.ServerBusy("Pad server is busy")
+        except httpx.HTTPError as e:
+            raise base.PadError("Could not connect to server", e)
+
+    async def coalesce(self, key, load):
+        """Lets concurrent calls with the same key share one call of `load`.
+        Calls that waited COALESCE_WAIT_TIMEOUT seconds for it make their
+        own.
+        """
+        future = self.calls.get(key)
+        if future is None:
+            future = self.calls[key] = asyncio.ensure_future(load())
+            future.add_done_callback(lambda f: self.calls.pop(key, None))
+            return await asyncio.shield(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), config.COALESCE_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            return await load()
+
+_servers = {}
+
+def _get_server(url, account=None, **kwargs):
+    if httpx is None:
+        raise ImportError("The asyncio backends require httpx")
+    # Accounts that log in have their own cookies
+    key = (url, account, asyncio.get_event_loop())
+    if key not in _servers:
+        _servers[key] = _Server(**kwargs)
+    return _servers[key]
+
+
+class AsyncEtherpadLiteBackend(object):
+    """Calls the HTTP API of an Etherpad Lite server
+    """
+
+    API_VERSION = "1.3.0"
+
+    def __init__(self, apikey, url):
+        # Pure helpers such as pad id composition are shared
+        self.sync = EtherpadLiteBackend(apikey, url)
+        self.url = self.sync.url
+        self.apikey = apikey
+        self.server = _get_server(self.url)
+
+    async def call(self, function, **params):
+        url = "/".join([self.sync.api, self.API_VERSION, function])
+        response = await self.server.request('POST', url, params={'apikey': self.apikey}, data=params)
+        try:
+            result = response.json()
+        except ValueError:
+            raise base.PadError("Invalid response from pad server", response.status_code)
+        if result.get('code') != 0:
+            raise base.PadError(result.get('message'), function)
+        return result.get('data')
+
+    async def _coalesced(self, function, **params):
+        key = (self.apikey, function, tuple(sorted(params.items())))
+        return await self.server.coalesce(key, lambda: self.call(function, **params))
+
+    async def is_online(self):
+        try:
+            await self._coalesced('checkToken')
+            return True
+        except base.PadError:
+            return False
+
+    async def get_or_create_group(self, mapper):
+        result = await self._coalesced('createGroupIfNotExistsFor', groupMapper=mapper)
+        return result['groupID']
+
+    async def create_group_pad(self, groupid, padname, text=None):
+        padid = self.sync.group_pad_id(groupid, self.sync.sanitize_pad_name(padname))
+        try:
+            await self.call('createGroupPad', groupID=groupid, padName=padname)
+        except base.ServerBusy:
+            raise
+        except base.PadError:
+            # The pad already exists
+            return padid
+        if text:
+            await self.set_text(padid, text)
+        return padid
+
+    async def set_password(self, padid, password):
+        await self.call('setPassword', padID=padid, password=password)
+        return True
+
+    async def set_public_status(self, padid, status):
+        await self.call('setPublicStatus', padID=padid, publicStatus="true" if status else "false")
+        return status
+
+    async def is_pad_public(self, padid):
+        result = await self._coalesced('getPublicStatus', padID=padid)
+        return result['publicStatus']
+
+    async def create_session(self, group_id, author_id, expires):
+        result = await self.call('createSession', groupID=group_id, authorID=author_id, validUntil=str(expires))
+        return result['sessionID']
+
+    async def create_sessions(self, group_ids, author_id, expires):
+        group_ids = list(dict.fromkeys(group_ids))
+        results = await asyncio.gather(
+            *[self.create_session(group_id, author_id, expires) for group_id in group_ids],
+            return_exceptions=True
+        )
+        return dict(
+            (group_id, None if isinstance(result, Exception) else result)
+            for group_id, result in zip(group_ids, results)
+        )
+
+    async def delete_session(self, session_id):
+        await self.call('deleteSession', sessionID=session_id)
+
+    async def delete_sessions(self, session_ids):
+        await asyncio.gather(*[self.delete_session(session_id) for session_id in session_ids], return_exceptions=True)
+
+    async def create_user(self, user_id, name=None):
+        result = await self._coalesced('createAuthorIfNotExistsFor', authorMapper=user_id, name=name or user_id)
+        return result['authorID']
+
+    async def get_pad_link(self, pad_id, user_id):
+        return self.sync.get_pad_link(pad_id, user_id)
+
+    async def get_text(self, pad_id):
+        result = await self._coalesced('getText', padID=pad_id)
+        return result['text']
+
+    async def get_revision(self, pad_id):
+        result = await self._coalesced('getRevisionsCount', padID=pad_id)
+        return result['revisions']
+
+    async def set_text(self, pad_id, text):
+        await self.call('setText', padID=pad_id, text=text)
+        return True
+
+    def __getattr__(self, name):
+        # Calls without an asyncio implementation run in a thread
+        return getattr(AsyncAdapter(self.sync), name)
+
+    async def search(self, group_id, query):
+        """Full text search of the pads of a group, provided by the
+        ep_search plugin
+        """
+        result = await self.call('search', groupID=group_id, query=query)
+        return result.get('pads', [])
+
+
+class AsyncHackMDBackend(object):
+    """Creates and reads notes on a HackMD server
+    """
+
+    def __init__(self, api_key, url):
+        self.url = clean_url(url)
+        self.api_key = api_key
+        self.server = _get_server(self.url, api_key)
+
+    async def _login(self):
+        if self.server.logged_in is None and self.api_key:
+            if not self.api_key.startswith('ldap:'):
+                raise ValueError("Authentication method not recognized")
+            parts = self.api_key[5:].split(':', 1)
+            if len(parts) != 2:
+                raise ValueError("API-Key has to be 'username:password'", parts)
+            data = {'username': parts[0], 'password': parts[1]}
+            await self.server.request('POST', "/".join([self.url, 'auth', 'ldap']), data=data)
+        self.server.logged_in = True
+
+    async def _request(self, method, url, **kwargs):
+        # Like HackMDBackend._request, logs in again once the login expired.
+        # Redirects are followed, as by requests, to notice the redirect to
+        # the start page
+        kwargs.setdefault('follow_redirects', True)
+        await self._login()
+        response = await self.server.request(method, url, **kwargs)
+        denied = response.status_code in (401, 403) or (response.history and clean_url(str(response.url)) == self.url)
+        if denied and self.api_key:
+            self.server.logged_in = None
+            await self._login()
+            response = await self.server.request(method, url, **kwargs)
+        return response
+
+    async def get_pad_link(self, pad_id, user_id):
+        return "".join(["/".join([self.url, pad_id]), "?both"])
+
+    async def create_group_pad(self, group_id, pad_name, text=None):
+        if not text:
+            text = "# {0}".format(pad_name)
+        response = await self._request(
+            'POST', "/".join([self.url, "new"]),
+            content=text.encode('utf-8'),
+            headers={'Content-Type': 'text/markdown'},
+        )
+        return str(response.url).split('/')[-1]
+
+    async def get_text(self, pad_id):
+        download_url = "/".join([self.url, pad_id, 'download'])
+
+        async def load():
+            response = await self._request('GET', download_url)
+            return response.text
+        return await self.server.coalesce(('download', pad_id), load)
+
+    def __getattr__(self, name):
+        # HackMD has no API for the other calls, which behave like on the
+        # base backend
+        method = getattr(base.PadBackend(), name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncAdapter(object):
+    """Runs the methods of a synchronous backend in a thread
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def __getattr__(self, name):
+        method = getattr(self.backend, name)
+        # The DjangoPad backend uses the database
+        return sync_to_async(method, thread_sensitive=True)
@@ -1,8 +1,157 @@
 import re
+import datetime
+import functools
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .. import config
+from ..concurrency import map_bounded
 
 class PadError(ValueError):
     pass
 
+class ServerBusy(PadError):
+    pass
+
+class PadNotFound(PadError):
+    pass
+
+def from_timestamp(ms):
+    """Converts a javascript timestamp to a datetime as used by the models
+    """
+    value = datetime.datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+    return value if settings.USE_TZ else timezone.make_naive(value)
+
+class Bulkhead(object):
+    """Limits the number of concurrent calls of this process to one pad
+    server. Callers wait at most `timeout` seconds for a free slot and get a
+    ServerBusy error otherwise, so a slow server can not tie up all threads.
+    """
+
+    def __init__(self, limit, timeout):
+        self.semaphore = threading.BoundedSemaphore(limit)
+        self.timeout = timeout
+
+    def __enter__(self):
+        if not self.semaphore.acquire(timeout=self.timeout):
+            raise ServerBusy("Pad server is busy")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.semaphore.release()
+
+_bulkheads = {}
+_bulkheads_lock = threading.Lock()
+
+def get_bulkhead(url):
+    """Returns the bulkhead shared by all clients of the server at `url`
+    """
+    with _bulkheads_lock:
+        if url not in _bulkheads:
+            _bulkheads[url] = Bulkhead(config.SERVER_MAX_CALLS, config.SERVER_QUEUE_TIMEOUT)
+        return _bulkheads[url]
+
+class Guarded(object):
+    """Wraps an API client object so that all its methods are called
+    within a bulkhead
+    """
+
+    def __init__(self, client, bulkhead):
+        self._client = client
+        self._bulkhead = bulkhead
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def call(*args, **kwargs):
+            with self._bulkhead:
+                return attr(*args, **kwargs)
+        return call
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight(object):
+    """Lets concurrent calls with the same key share the result of the
+    first one instead of all being made. Calls that waited `timeout`
+    seconds for it give up and make their own.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, func, timeout=None):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+        if leader:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                call.done.set()
+        elif not call.done.wait(timeout):
+            return func()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+_flights = SingleFlight()
+_missing = object()
+
+def coalesce(method=None, shared=False):
+    """Decorates idempotent backend methods, so that concurrent identical
+    calls of the same account on the same server share one request. With
+    COALESCE_CACHE_TIMEOUT set, the results of `shared` methods, which must
+    never change, such as the id of a group, are also shared across
+    processes through the cache.
+    """
+    if method is None:
+        return functools.partial(coalesce, shared=shared)
+
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        key = (self.client_key(), method.__name__, args, tuple(sorted(kwargs.items())))
+        if not shared or not config.COALESCE_CACHE_TIMEOUT:
+            return _flights.do(key, lambda: method(self, *args, **kwargs), config.COALESCE_WAIT_TIMEOUT)
+
+        cache_key = 'padman:coalesce:' + hashlib.md5(repr(key).encode('utf-8')).hexdigest()
+        def load():
+            result = cache.get(cache_key, _missing)
+            if result is _missing:
+                result = method(self, *args, **kwargs)
+                cache.set(cache_key, result, config.COALESCE_CACHE_TIMEOUT)
+            return result
+        return _flights.do(key, load, config.COALESCE_WAIT_TIMEOUT)
+    return call
+
+def fresh(method):
+    """Returns a coalesced backend method without coalescing, for callers
+    that must not get the result of a call that started before their own,
+    e.g. reading a text right after checking its revision
+    """
+    unwrapped = getattr(method, '__wrapped__', None)
+    if unwrapped is None:
+        return method
+    return functools.partial(unwrapped, method.__self__)
+
 class PadBackend(object):
     """This is the abstract base class for all pad backends. It
     defines all the avaliable API commands, which will then be
@@ -16,6 +165,12 @@ class PadBackend(object):
         name = re.sub(r'\:+', '_', name)
         return name
 
+    def client_key(self):
+        """Identifies the server and account this client calls as, so that
+        only identical calls of the same account share their results
+        """
+        return getattr(self, 'url', None)
+
     def is_online(self):
         """Checks wether this backed is currently online
         """
@@ -29,13 +184,27 @@ class PadBackend(object):
     def delete_group(self, group_id):
         pass
 
-    def create_group_pad(self, groupid, padname):
+    def list_all_groups(self):
+        """Returns the ids of all groups on the server, or None if the
+        backend can not list them
+        """
+        return None
+
+    def group_pad_id(self, groupid, padname):
+        """Returns the id of the pad with the given (sanitized) name in a group
+        """
+        return ":".join([groupid, padname])
+
+    def create_group_pad(self, groupid, padname, text=None):
         """Creates a pad within a group
         """
-        return ":".join([groupid, self.sanitize_pad_name(padname)])
+        return self.group_pad_id(groupid, self.sanitize_pad_name(padname))
 
     def list_group_pads(self, group_id):
-        return []
+        """Returns the names of the pads of a group, or None if the backend
+        can not list them
+        """
+        return None
 
     def set_password(self, padid, password):
         return False
@@ -55,6 +224,18 @@ class PadBackend(object):
     def delete_session(self, sessionid):
         pass
 
+    def list_group_sessions(self, group_id):
+        """Returns the sessions of a group as a dict mapping session ids to
+        dicts with `groupID`, `authorID` and `validUntil` (a unix timestamp),
+        or None if the backend has no sessions
+        """
+        return None
+
+    def list_author_sessions(self, author_id):
+        """Returns the sessions of an author like `list_group_sessions`
+        """
+        return None
+
     def create_user(self, user_id, name=None):
         return user_id
 
@@ -62,4 +243,88 @@ class PadBackend(object):
         return None
 
     def get_text(self, pad_id):
-        return None
\ No newline at end of file
+        return None
+
+    def get_revision(self, pad_id):
+        """Returns a value that changes whenever the pad is edited, or
+        None if the backend can not tell
+        """
+        return None
+
+    def get_last_edited(self, pad_id):
+        """Returns when the pad was last edited, or None if unknown
+        """
+        return None
+
+    def delete_unchanged_pad(self, pad_id, revision):
+        """Deletes a pad unless it was edited since `get_revision` returned
+        `revision`, and returns False if it was. This only narrows the race
+        for backends that can not check and delete in one step.
+        """
+        if self.get_revision(pad_id) != revision:
+            return False
+        self.delete_pad(pad_id)
+        return True
+
+    def get_user_count(self, pad_id):
+        """Returns the number of users currently editing the pad, or None if
+        unknown
+        """
+        return None
+
+    def set_text(self, pad_id, text):
+        """Replaces the text of a pad
+        """
+        return False
+
+    def get_html(self, pad_id):
+        """Returns the formatted text of a pad as HTML, or None if the
+        backend only stores plain text
+        """
+        return None
+
+    def set_html(self, pad_id, html):
+        """Replaces the text of a pad with formatted HTML
+        """
+        return False
+
+    # Batch methods. They call the single item methods concurrently, unless
+    # a backend overrides them with a native bulk operation, and return a
+    # dict mapping every item to its result. Calls that fail map to the
+    # result of an unsupported call (None or False).
+
+    def _fan_out(self, func, items, failed=None):
+        items = list(dict.fromkeys(items))
+        if len(items) == 1:
+            try:
+                return {items[0]: func(items[0])}
+            except Exception:
+                return {items[0]: failed}
+        return dict(
+            (item, failed if error is not None else result) for item, result, error in
+            map_bounded(func, items, config.SERVER_CONCURRENCY)
+        )
+
+    def create_sessions(self, group_ids, author_id, expires):
+        """Creates a session of an author for every group
+        """
+        return self._fan_out(lambda group_id: self.create_session(group_id, author_id, expires), group_ids)
+
+    def delete_sessions(self, session_ids):
+        return self._fan_out(self.delete_session, session_ids)
+
+    def create_users(self, users):
+        """Creates authors for `(user_id, name)` pairs, keyed by user id
+        """
+        users = dict(users)
+        return self._fan_out(lambda user_id: self.create_user(user_id, name=users[user_id]), users)
+
+    def get_or_create_groups(self, mappers):
+        return self._fan_out(self.get_or_create_group, mappers)
+
+    def get_texts(self, pad_ids):
+        # Callers compare the texts with their revisions
+        return self._fan_out(fresh(self.get_text), pad_ids)
+
+    def delete_pads(self, pad_ids):
+        return self._fan_out(self.delete_pad, pad_ids, failed=False)
@@ -0,0 +1,186 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+
+from . import base
+from .. import config
+
+# Number of pads read with one query by `get_texts`
+GET_TEXTS_CHUNK = 200
+
+
+def splice(old, new):
+    """Computes the delta between two texts as the length of the common
+    head, the length of the common tail and the text inserted between them
+    """
+    limit = min(len(old), len(new))
+    head = 0
+    while head < limit and old[head] == new[head]:
+        head += 1
+    limit -= head
+    tail = 0
+    while tail < limit and old[-1 - tail] == new[-1 - tail]:
+        tail += 1
+    return head, tail, new[head:len(new) - tail]
+
+def apply_splice(text, head, tail, insert):
+    return "".join([text[:head], insert, text[len(text) - tail:]])
+
+
+class DjangoPadBackend(base.PadBackend):
+    """In-process backend that keeps the pad contents in the database.
+
+    Every change is stored as an append-only revision holding a splice
+    delta against its predecessor, and every DJANGOPAD_SNAPSHOT_INTERVAL
+    revisions additionally carries the full text, so reading a pad never
+    replays more than a few deltas.
+    """
+
+    def _models(self):
+        # The models module imports the backends, so resolve it lazily
+        from .. import models
+        return models
+
+    def _get_pad(self, pad_id):
+        models = self._models()
+        try:
+            return models.StoredPad.objects.get(padid=pad_id)
+        except models.StoredPad.DoesNotExist:
+            raise base.PadNotFound("No such pad", pad_id)
+
+    def _read(self, pad):
+        revisions = pad.revisions.order_by('-rev')
+        snapshot = revisions.filter(snapshot__isnull=False).first()
+        if snapshot is None:
+            return ""
+        text = snapshot.snapshot
+        deltas = pad.revisions.filter(rev__gt=snapshot.rev).order_by('rev')
+        for rev in deltas.only('keep_head', 'keep_tail', 'insert'):
+            text = apply_splice(text, rev.keep_head, rev.keep_tail, rev.insert)
+        return text
+
+    def create_group_pad(self, groupid, padname, text=None):
+        models = self._models()
+        padid = super().create_group_pad(groupid, padname)
+        try:
+            with transaction.atomic():
+                pad = models.StoredPad.objects.create(padid=padid, groupid=groupid)
+                pad.revisions.create(rev=0, snapshot=text or "")
+        except IntegrityError:
+            if text:
+                self.set_text(padid, text)
+        return padid
+
+    def list_group_pads(self, group_id):
+        models = self._models()
+        pads = models.StoredPad.objects.filter(groupid=group_id)
+        return [padid.split(':', 1)[1] for padid in pads.values_list('padid', flat=True)]
+
+    def delete_group(self, group_id):
+        self._models().StoredPad.objects.filter(groupid=group_id).delete()
+        return True, group_id
+
+    def set_password(self, padid, password):
+        self._models().StoredPad.objects.filter(padid=padid).update(password=password or "")
+        return True
+
+    def set_public_status(self, padid, status):
+        self._models().StoredPad.objects.filter(padid=padid).update(is_public=status)
+        return status
+
+    def is_pad_public(self, padid):
+        return self._get_pad(padid).is_public
+
+    def delete_pad(self, padid):
+        deleted, _ = self._models().StoredPad.objects.filter(padid=padid).delete()
+        return deleted > 0
+
+    def delete_unchanged_pad(self, pad_id, revision):
+        with transaction.atomic():
+            # Holding the write lock, as set_text does, keeps the revision
+            # from changing until the pad is gone
+            pads = self._models().StoredPad.objects.filter(padid=pad_id, head=revision)
+            if not pads.update(head=F('head')):
+                return False
+            pads.delete()
+            return True
+
+    def delete_pads(self, pad_ids):
+        pads = self._models().StoredPad.objects.filter(padid__in=pad_ids)
+        deleted = set(pads.values_list('padid', flat=True))
+        pads.delete()
+        return dict((pad_id, pad_id in deleted) for pad_id in pad_ids)
+
+    def get_pad_link(self, pad_id, user_id):
+        return reverse('padman:padtext', args=[pad_id])
+
+    def get_text(self, pad_id):
+        return self._read(self._get_pad(pad_id))
+
+    def get_texts(self, pad_ids):
+        pad_ids = list(dict.fromkeys(pad_ids))
+        texts = {}
+        # Keep every query well below the parameter and expression depth
+        # limits of SQLite
+        for i in range(0, len(pad_ids), GET_TEXTS_CHUNK):
+            texts.update(self._get_texts(pad_ids[i:i + GET_TEXTS_CHUNK]))
+        return texts
+
+    def _get_texts(self, pad_ids):
+        models = self._models()
+        pads = dict((pad.pk, pad) for pad in models.StoredPad.objects.filter(padid__in=pad_ids))
+        texts = dict.fromkeys(pad_ids)
+        if not pads:
+            return texts
+
+        # The latest regular snapshot and its deltas of all pads at once
+        interval = config.DJANGOPAD_SNAPSHOT_INTERVAL
+        query = Q()
+        for pad in pads.values():
+            query |= Q(pad=pad.pk, rev__gte=pad.head - pad.head % interval)
+        revisions = {}
+        for rev in models.PadRevision.objects.filter(query).order_by('pad', 'rev'):
+            revisions.setdefault(rev.pad_id, []).append(rev)
+
+        for pk, pad in pads.items():
+            chain = revisions.get(pk)
+            if not chain or chain[0].snapshot is None:
+                # Snapshots were taken at another interval
+                texts[pad.padid] = self._read(pad)
+                continue
+            text = chain[0].snapshot
+            for rev in chain[1:]:
+                text = apply_splice(text, rev.keep_head, rev.keep_tail, rev.insert)
+            texts[pad.padid] = text
+        return texts
+
+    def get_revision(self, pad_id):
+        return self._get_pad(pad_id).head
+
+    def get_last_edited(self, pad_id):
+        return self._get_pad(pad_id).last_edited
+
+    def set_text(self, pad_id, text):
+        models = self._models()
+        with transaction.atomic():
+            # Lock the pad with a write before reading it, which also works
+            # on databases without SELECT ... FOR UPDATE
+            pads = models.StoredPad.objects.filter(padid=pad_id)
+            if not pads.update(head=F('head')):
+                raise base.PadNotFound("No such pad", pad_id)
+            pad = pads.get()
+            old = self._read(pad)
+            if old == text:
+                return False
+            rev = pad.head + 1
+            keep_head, keep_tail, insert = splice(old, text)
+            pad.revisions.create(
+                rev=rev,
+                keep_head=keep_head,
+                keep_tail=keep_tail,
+                insert=insert,
+                snapshot=(text if rev % config.DJANGOPAD_SNAPSHOT_INTERVAL == 0 else None),
+            )
+            pad.head = rev
+            pad.save(update_fields=['head', 'last_edited'])
+        return True
@@ -13,14 +13,19 @@ class EtherpadLiteBackend(base.PadBackend):
     def __init__(self, apikey, url):
 
         self.url = url[:-1] if (url[-1:] == '/') else url
+        self.apikey = apikey
         self.api = "/".join([self.url, "api"])
-        self.epclient = EtherpadLiteClient(apikey, self.api)
+        self.epclient = base.Guarded(EtherpadLiteClient(apikey, self.api), base.get_bulkhead(self.url))
+
+    def client_key(self):
+        return (self.url, self.apikey)
 
     def sanitize_pad_name(self, name):
         name = re.sub(r'\s+', '_', name)
         name = re.sub(r':+', '_', name)
         return name
 
+    @base.coalesce
     def is_online(self):
         try:
             self.epclient.checkToken()
@@ -30,6 +35,7 @@ class EtherpadLiteBackend(base.PadBackend):
         except URLError as e:
             return False
 
+    @base.coalesce(shared=True)
     def get_or_create_group(self, mapper):
         try:
             result = self.epclient.createGroupIfNotExistsFor(mapper)
@@ -41,19 +47,30 @@ class EtherpadLiteBackend(base.PadBackend):
         try:
             self.epclient.deleteGroup(group_id)
             return True, group_id
+        except base.ServerBusy:
+            raise
         except ValueError as e:
             return False, str(e)
 
+    def list_all_groups(self):
+        result = self.epclient.listAllGroups()
+        return result['groupIDs']
+
     def list_group_pads(self, group_id):
         result = self.epclient.listPads(group_id)
         return [pad.split('$')[1] for pad in result['padIDs']]
 
+    def group_pad_id(self, groupid, padname):
+        return "$".join([groupid, padname])
+
     def create_group_pad(self, groupid, padname, text=None):
-        padid = "$".join([groupid, self.sanitize_pad_name(padname)])
+        padid = self.group_pad_id(groupid, self.sanitize_pad_name(padname))
         try:
             self.epclient.createGroupPad(groupid, padname)
             if text:
                 self.epclient.setText(padid, text)
+        except base.ServerBusy:
+            raise
         except ValueError:
             pass
         return padid
@@ -70,9 +87,12 @@ class EtherpadLiteBackend(base.PadBackend):
         try:
             self.epclient.deletePad(padid)
             return True
+        except base.ServerBusy:
+            raise
         except ValueError:
             return False
 
+    @base.coalesce
     def is_pad_public(self, padid):
         result = self.epclient.getPublicStatus(padid)
         return result['publicStatus']
@@ -84,6 +104,13 @@ class EtherpadLiteBackend(base.PadBackend):
     def delete_session(self, session_id):
         self.epclient.deleteSession(session_id)
 
+    def list_group_sessions(self, group_id):
+        return self.epclient.listSessionsOfGroup(group_id) or {}
+
+    def list_author_sessions(self, author_id):
+        return self.epclient.listSessionsOfAuthor(author_id) or {}
+
+    @base.coalesce(shared=True)
     def create_user(self, user_id, name=None):
         name = name or user_id
         result = self.epclient.createAuthorIfNotExistsFor(user_id, name)
@@ -93,6 +120,38 @@ class EtherpadLiteBackend(base.PadBackend):
         base = "/".join([self.url, "p", pad_id])
         return "".join([base, "?userName=", user_id]) if user_id else base
 
+    @base.coalesce
     def get_text(self, pad_id):
         text = self.epclient.getText(pad_id)
         return text['text']
+
+    def get_revision(self, pad_id):
+        try:
+            result = self.epclient.getRevisionsCount(pad_id)
+        except base.ServerBusy:
+            raise
+        except ValueError as e:
+            if str(e) == "padID does not exist":
+                raise base.PadNotFound("No such pad", pad_id)
+            raise
+        return result['revisions']
+
+    def get_last_edited(self, pad_id):
+        result = self.epclient.getLastEdited(pad_id)
+        return base.from_timestamp(result['lastEdited'])
+
+    def get_user_count(self, pad_id):
+        result = self.epclient.padUsersCount(pad_id)
+        return result['padUsersCount']
+
+    def set_text(self, pad_id, text):
+        self.epclient.setText(pad_id, text)
+        return True
+
+    def get_html(self, pad_id):
+        result = self.epclient.getHtml(pad_id)
+        return result['html']
+
+    def set_html(self, pad_id, html):
+        self.epclient.setHtml(pad_id, html)
+        return True
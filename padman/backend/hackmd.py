@@ -1,5 +1,5 @@
-import requests, re, json
-from .base import PadBackend, PadError
+import requests, re, json, threading
+from .base import PadBackend, PadError, ServerBusy, Guarded, coalesce, get_bulkhead
 from urllib.parse import urlparse
 
 def clean_url(url):
@@ -9,24 +9,50 @@ class HackMDBackend(PadBackend):
 
     def __init__(self, api_key, url):
         self.url = clean_url(url)
-        self.session = requests.session()
+        self.credentials = None
         if api_key:
             if api_key.startswith('ldap:'):
                 parts = api_key[5:].split(':', 1)
                 if len(parts) == 2:
-                    data = {'username': parts[0], 'password': parts[1]}
-                    try:
-                        self.session.post("/".join([self.url, 'auth', 'ldap']), data=data)
-                    except Exception as e:
-                        raise PadError("Could not connect to server")
+                    self.credentials = {'username': parts[0], 'password': parts[1]}
                 else:
                     raise ValueError("API-Key has to be 'username:password'", parts)
             else:
                 raise ValueError("Authentication method not recognized")
-        try:
-            self.session.get(self.url)
-        except Exception as e:
-            raise PadError("Could not connect to server")
+        # Sessions of requests are not thread safe, so every thread logs in
+        # with its own
+        self._local = threading.local()
+        self._session()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = Guarded(requests.session(), get_bulkhead(self.url))
+            try:
+                if self.credentials:
+                    session.post("/".join([self.url, 'auth', 'ldap']), data=self.credentials)
+                session.get(self.url)
+            except ServerBusy:
+                raise
+            except Exception as e:
+                raise PadError("Could not connect to server")
+            self._local.session = session
+        return session
+
+    def client_key(self):
+        return (self.url, self.credentials and self.credentials['username'])
+
+    def _request(self, method, url, **kwargs):
+        """Makes a request in the session of the current thread. Logs in
+        again once when the login expired, which shows as a denied request
+        or a redirect to the start page.
+        """
+        response = getattr(self._session(), method)(url, **kwargs)
+        denied = response.status_code in (401, 403) or (response.history and clean_url(response.url) == self.url)
+        if denied and self.credentials:
+            self._local.session = None
+            response = getattr(self._session(), method)(url, **kwargs)
+        return response
 
     def get_pad_link(self, pad_id, user_id):
         # ?view / ?edit / ?both
@@ -35,15 +61,16 @@ class HackMDBackend(PadBackend):
     def create_group_pad(self, group_id, pad_name, text=None):
         if not text:
             text = "# {0}".format(pad_name)
-        response = self.session.post("/".join([self.url, "new"]), data=text.encode('utf-8'), headers={'Content-Type': 'text/markdown'})
+        response = self._request('post', "/".join([self.url, "new"]), data=text.encode('utf-8'), headers={'Content-Type': 'text/markdown'})
         pad_id = response.url.split('/')[-1]
         return pad_id
 
+    @coalesce
     def get_text(self, pad_id):
         # socket_io = "/".join([self.url, 'socket.io', "?noteId={0}&EIO=3&transport=polling".format(pad_id)])
 
         download_url = "/".join([self.url, pad_id, 'download'])
-        response = self.session.get(download_url)
+        response = self._request('get', download_url)
         return response.text
 
         # io = response.cookies['io']
@@ -0,0 +1,92 @@
+"""
+Creation of many pads at once, e.g. one per participant of a course
+"""
+
+import datetime
+
+from django.template import Context
+
+from . import config, models, templating
+from .backend.base import PadError
+from .concurrency import map_bounded
+from .counts import adjust_pad_counts
+
+
+def get_or_create_group(category, server):
+    """Returns the pad group of a category on a server, creating it if needed
+    """
+    group = models.PadGroup.objects.filter(server=server, parent=category).first()
+    if group is None:
+        group = models.PadGroup(
+            server=server,
+            parent=category,
+            group_mapper=category.slug,
+            name=category.name,
+        )
+        group.save()
+    return group
+
+
+def bulk_create_pads(category, server, names, text=None, template=None):
+    """Creates a pad for every name in the category on the given server.
+
+    The pads are created on the server concurrently and inserted with a
+    single query. Their initial text is `text`, or `template` (a Pad)
+    rendered with the pad name. Returns a list of `(name, pad, error)`
+    with either the new Pad or the reason it could not be created.
+
+    Names the server turns into the same pad id, such as "a b" and "a_b"
+    on Etherpad, only create the pad of the first one.
+    """
+    group = get_or_create_group(category, server)
+    client = server.client
+
+    padids = dict((name, client.group_pad_id(group.groupID, client.sanitize_pad_name(name))) for name in names)
+    existing = set(group.pad_set.filter(name__in=names).values_list('name', flat=True))
+    existing_padids = set(group.pad_set.filter(padid__in=padids.values()).values_list('padid', flat=True))
+    results = []
+    todo = []
+    claimed = {}
+    for name in names:
+        padid = padids[name]
+        if name in existing or padid in existing_padids or claimed.get(padid) == name:
+            results.append((name, None, PadError("Pad already exists")))
+        elif padid in claimed:
+            results.append((name, None, PadError("Pad name collides with", claimed[padid])))
+        else:
+            claimed[padid] = name
+            todo.append(name)
+
+    text_template = templating.pad_template(template, template.server.client) if template else None
+    date = datetime.datetime.now()
+
+    def create(name):
+        initial = text
+        if text_template is not None:
+            initial = text_template.render(Context({
+                "password": "",
+                "date": date,
+                "name": name,
+                "slug": "",
+            }))
+        return client.create_group_pad(group.groupID, name, text=initial)
+
+    pads = []
+    for name, padid, error in map_bounded(create, todo, config.SERVER_CONCURRENCY):
+        if error is not None:
+            results.append((name, None, error))
+            continue
+        pad = models.Pad(
+            name=name,
+            name_normalized=models.normalize_name(name),
+            server=server,
+            group=group,
+            padid=padid,
+        )
+        pads.append(pad)
+        results.append((name, pad, None))
+
+    models.Pad.objects.bulk_create(pads)
+    # bulk_create does not send signals
+    adjust_pad_counts(category.pk, len(pads))
+    return results
@@ -0,0 +1,109 @@
+"""
+Helpers to fan out blocking backend calls over a bounded number of threads
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from django.db import connections
+
+from . import config
+
+
+def _call(func, item):
+    try:
+        return item, func(item), None
+    except Exception as e:
+        return item, None, e
+    finally:
+        # Worker threads get their own database connections
+        connections.close_all()
+
+
+class RateLimit(object):
+    """Spaces out calls from any number of threads to at most `rate` per
+    second. A rate of None or 0 does not limit.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.lock = threading.Lock()
+        self.next = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(self.next, now)
+            self.next = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+_background = None
+_background_lock = threading.Lock()
+
+def run_in_background(func, *args):
+    """Calls `func(*args)` on a shared worker thread without waiting for
+    the result. Errors are dropped, so `func` should be safe to retry.
+    """
+    global _background
+    with _background_lock:
+        if _background is None:
+            _background = ThreadPoolExecutor(max_workers=config.SERVER_CONCURRENCY)
+    return _background.submit(_call, lambda args: func(*args), args)
+
+
+def map_bounded(func, items, workers):
+    """Calls `func` for every item on at most `workers` threads and yields
+    `(item, result, error)` triples in completion order. Items are consumed
+    lazily, so only a bounded number of them is in flight at any time.
+    """
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for item in items:
+            pending.add(executor.submit(_call, func, item))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def map_grouped(func, items, key, workers):
+    """Like `map_bounded`, but allows `workers` concurrent calls per
+    `key(item)`, e.g. per pad server, so that a slow server does not hold
+    up the others.
+    """
+    queues = OrderedDict()
+    for item in items:
+        queues.setdefault(key(item), deque()).append(item)
+    if not queues:
+        return
+
+    running = dict.fromkeys(queues, 0)
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers * len(queues)) as executor:
+
+        def fill(k):
+            while running[k] < workers and queues[k]:
+                future = executor.submit(_call, func, queues[k].popleft())
+                pending[future] = k
+                running[k] += 1
+
+        for k in queues:
+            fill(k)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                k = pending.pop(future)
+                running[k] -= 1
+                fill(k)
+                yield future.result()
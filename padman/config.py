@@ -7,6 +7,92 @@ This file centralizes configuration of this module
 
 SESSION_LENGTH = 1 * 24 * 60 * 60
 
+# Sessions are renewed in the background once they expire within this many
+# seconds, so that users do not wait for the pad server when they run out.
+# Each new session is shortened by a random number of seconds up to
+# SESSION_JITTER, so that users who logged in together do not all renew at
+# the same time
+
+SESSION_RENEWAL_WINDOW = 2 * 60 * 60
+SESSION_JITTER = 30 * 60
+
+# The DjangoPad backend stores every change as a delta against the previous
+# revision and keeps the full text every this many revisions, which bounds
+# the number of deltas applied when reading a pad
+
+DJANGOPAD_SNAPSHOT_INTERVAL = 20
+
+# The number of concurrent calls a batch job (backups, exports, ...) issues
+# against a single pad server
+
+SERVER_CONCURRENCY = 4
+
+# Every process makes at most SERVER_MAX_CALLS concurrent calls to a single
+# pad server. Further calls wait up to SERVER_QUEUE_TIMEOUT seconds for one
+# of them to finish and fail otherwise, so that a slow server does not hold
+# up the pages of the others
+
+SERVER_MAX_CALLS = 8
+SERVER_QUEUE_TIMEOUT = 2
+
+# Whether a pad server is online is checked at most every this many seconds
+
+HEALTH_CHECK_INTERVAL = 30
+
+# The async views hold many more calls open at once. Each process keeps at
+# most this many connections to a single pad server
+
+ASYNC_SERVER_CONNECTIONS = 100
+
+# Identical concurrent calls to a pad server, such as fetching the text of
+# a popular pad, are made only once per process. Set this to a number of
+# seconds to also share the results of lookups that never change, such as
+# group and author ids, between processes through the cache
+
+COALESCE_CACHE_TIMEOUT = 0
+
+# Calls that wait for an identical call in flight make their own request if
+# it did not finish after this many seconds
+
+COALESCE_WAIT_TIMEOUT = 10
+
+# The number of pads shown per page in category and group listings
+
+PADS_PER_PAGE = 50
+
+# The category tree is cached until it changes. Entries of outdated versions
+# are left to expire after this many seconds
+
+TREE_CACHE_TIMEOUT = 24 * 60 * 60
+
+# The number of compiled pad templates kept per process
+
+TEMPLATE_CACHE_SIZE = 64
+
+# Render templates that only substitute plain `{{ variable }}` names without
+# the template engine. Set this to False to always use the engine
+
+TEMPLATE_FAST_PATH = True
+
+# Pads in the warm pool of a template are rendered when the pool is filled.
+# They are only handed out for this many seconds, so that dates in their
+# text stay reasonably accurate
+
+POOL_MAX_AGE = 60 * 60
+
+# Shortlinks to pads are resolved to pad ids through the cache, entries
+# expire after this many seconds
+
+SHORTLINK_CACHE_TIMEOUT = 24 * 60 * 60
+
+# With padman.routers.PadmanRouter in DATABASE_ROUTERS, the pad views read
+# padman models from this database alias while writes go to the default
+# database. After writing, a user reads from the default database for
+# PRIMARY_STICKINESS seconds so they do not see a lagging replica
+
+READ_REPLICA = None
+PRIMARY_STICKINESS = 10
+
 # Uncomment this tuple and supply values to define a testing server for the
 # automated tests
 #
@@ -0,0 +1,74 @@
+"""
+Maintains the denormalized pad counts of PadCategory.
+
+`pad_count` counts the pads in the groups of a category itself and
+`subtree_pad_count` those of the category and all its descendants. Pad
+changes adjust them incrementally with F() expressions over the MPTT
+ancestor range, structural changes of the tree recompute the subtree sums
+from the direct counts.
+"""
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import tree
+
+
+def adjust_pad_counts(category_id, delta):
+    """Adds `delta` to the counts of a category and its ancestors
+    """
+    from .models import PadCategory
+
+    if category_id is None or not delta:
+        return
+    with transaction.atomic():
+        node = PadCategory.objects.filter(pk=category_id).values('tree_id', 'lft', 'rght').first()
+        if node is None:
+            return
+        PadCategory.objects.filter(pk=category_id).update(pad_count=F('pad_count') + delta)
+        PadCategory.objects.filter(
+            tree_id=node['tree_id'],
+            lft__lte=node['lft'],
+            rght__gte=node['rght'],
+        ).update(subtree_pad_count=F('subtree_pad_count') + delta)
+        tree.invalidate_counts()
+
+
+def rebuild_subtree_counts():
+    """Recomputes the subtree counts from the direct counts, e.g. after
+    categories were moved or deleted
+    """
+    from .models import PadCategory
+
+    with transaction.atomic():
+        nodes = list(PadCategory.objects.select_for_update().order_by('tree_id', 'lft').values(
+            'pk', 'tree_id', 'lft', 'rght', 'pad_count', 'subtree_pad_count',
+        ))
+        totals = {}
+        ancestors = []
+        for node in nodes:
+            while ancestors and (ancestors[-1]['tree_id'] != node['tree_id'] or ancestors[-1]['rght'] < node['lft']):
+                ancestors.pop()
+            ancestors.append(node)
+            for ancestor in ancestors:
+                totals[ancestor['pk']] = totals.get(ancestor['pk'], 0) + node['pad_count']
+        for node in nodes:
+            if node['subtree_pad_count'] != totals[node['pk']]:
+                PadCategory.objects.filter(pk=node['pk']).update(subtree_pad_count=totals[node['pk']])
+        tree.invalidate_counts()
+
+
+def rebuild_pad_counts():
+    """Recomputes all counts from the pads
+    """
+    from .models import Pad, PadCategory
+
+    with transaction.atomic():
+        counts = dict(
+            Pad.objects.filter(group__parent__isnull=False).order_by()
+            .values_list('group__parent').annotate(count=Count('pk'))
+        )
+        for pk, pad_count in PadCategory.objects.values_list('pk', 'pad_count'):
+            if pad_count != counts.get(pk, 0):
+                PadCategory.objects.filter(pk=pk).update(pad_count=counts.get(pk, 0))
+        rebuild_subtree_counts()
@@ -44,6 +44,9 @@ class SettingsForm(forms.ModelForm):
         model = models.Pad
         exclude = ("padid", "server", "group")
 
+class PadTextForm(forms.Form):
+    text = forms.CharField(label=_("Text"), widget=forms.Textarea, required=False, strip=False)
+
 class SearchForm(forms.Form):
     query = forms.CharField()
     
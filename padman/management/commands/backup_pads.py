@@ -0,0 +1,126 @@
+# coding=utf-8
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from collections import OrderedDict
+
+from django.core.management.base import BaseCommand
+
+from padman import config
+from padman.concurrency import map_grouped
+from padman.models import Pad
+
+# Number of pads whose text is fetched with one batch call
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = "Writes compressed, content-addressed snapshots of all pads to a directory"
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--workers', type=int, default=config.SERVER_CONCURRENCY,
+            help="Concurrent requests per pad server",
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Fetch all pads, even if their revision did not change",
+        )
+
+    def object_path(self, digest):
+        return os.path.join(self.directory, 'objects', digest[:2], digest + '.txt.gz')
+
+    def write_object(self, text):
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        return digest
+
+    def write_manifest(self, manifest):
+        path = os.path.join(self.directory, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+        stamp = datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+        history = os.path.join(self.directory, 'manifests')
+        os.makedirs(history, exist_ok=True)
+        shutil.copyfile(path, os.path.join(history, stamp + '.json'))
+
+    def handle(self, *args, **options):
+        self.directory = options['directory']
+        os.makedirs(self.directory, exist_ok=True)
+
+        try:
+            with open(os.path.join(self.directory, 'manifest.json')) as f:
+                previous = json.load(f)
+        except FileNotFoundError:
+            previous = {}
+
+        pads = Pad.objects.select_related('server').exclude(padid=None).order_by('server', 'pk')
+        clients = {}
+        for pad in pads:
+            if pad.server_id not in clients:
+                clients[pad.server_id] = pad.server.client
+
+        def get_revision(pad):
+            return clients[pad.server_id].get_revision(pad.padid)
+
+        manifest = {}
+        changed = OrderedDict()
+        skipped = failed = 0
+        for pad, revision, error in map_grouped(get_revision, pads, lambda pad: pad.server_id, options['workers']):
+            entry = previous.get(str(pad.pk))
+            if error is not None:
+                failed += 1
+                self.stderr.write("{0} ({1}): {2}".format(pad.padid, pad.server, error))
+                # Keep the last good snapshot of this pad
+                if entry is not None:
+                    manifest[str(pad.pk)] = entry
+                continue
+
+            if (not options['force'] and entry and revision is not None
+                    and entry['padid'] == pad.padid
+                    and entry['revision'] == revision
+                    and os.path.exists(self.object_path(entry['sha256']))):
+                skipped += 1
+                manifest[str(pad.pk)] = dict(entry, name=pad.name)
+                continue
+            changed.setdefault(pad.server_id, []).append((pad, revision))
+
+        # Fetch the texts of the changed pads with the batch method of each
+        # backend, a bounded number of pads at a time
+        written = 0
+        for server_id, changes in changed.items():
+            for i in range(0, len(changes), BATCH_SIZE):
+                batch = changes[i:i + BATCH_SIZE]
+                texts = clients[server_id].get_texts([pad.padid for pad, _ in batch])
+                for pad, revision in batch:
+                    text = texts.get(pad.padid)
+                    if text is None:
+                        failed += 1
+                        self.stderr.write("{0} ({1}): could not fetch the text".format(pad.padid, pad.server))
+                        if str(pad.pk) in previous:
+                            manifest[str(pad.pk)] = previous[str(pad.pk)]
+                        continue
+
+                    written += 1
+                    manifest[str(pad.pk)] = {
+                        'name': pad.name,
+                        'server': pad.server_id,
+                        'padid': pad.padid,
+                        'revision': revision,
+                        'sha256': self.write_object(text),
+                    }
+
+        self.write_manifest(manifest)
+        self.stdout.write("{0} pads fetched, {1} unchanged, {2} failed".format(written, skipped, failed))
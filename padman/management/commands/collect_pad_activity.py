@@ -0,0 +1,75 @@
+# coding=utf-8
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from padman import config
+from padman.concurrency import map_grouped
+from padman.models import Pad
+
+
+class Command(BaseCommand):
+    help = "Stores revision count, last edit and active users of all pads in the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=config.SERVER_CONCURRENCY,
+            help="Concurrent requests per pad server",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help="Number of pads fetched and updated at once",
+        )
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help="Keep collecting, pausing this many seconds between runs",
+        )
+
+    def collect(self, workers, batch_size):
+        clients = {}
+
+        def fetch(pad):
+            client = clients[pad.server_id]
+            return (
+                client.get_revision(pad.padid),
+                client.get_last_edited(pad.padid),
+                client.get_user_count(pad.padid),
+            )
+
+        pads = Pad.objects.select_related('server').exclude(padid=None).order_by('pk')
+        last_pk = 0
+        updated = failed = 0
+        while True:
+            batch = list(pads.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for pad in batch:
+                if pad.server_id not in clients:
+                    clients[pad.server_id] = pad.server.client
+
+            changed = []
+            for pad, result, error in map_grouped(fetch, batch, lambda pad: pad.server_id, workers):
+                if error is not None:
+                    failed += 1
+                    self.stderr.write("{0} ({1}): {2}".format(pad.padid, pad.server, error))
+                    continue
+                revisions, last_edited, user_count = result
+                pad.revisions = revisions
+                pad.last_edited = last_edited
+                pad.user_count = user_count or 0
+                pad.activity_updated = timezone.now()
+                changed.append(pad)
+
+            Pad.objects.bulk_update(changed, ['revisions', 'last_edited', 'user_count', 'activity_updated'])
+            updated += len(changed)
+        return updated, failed
+
+    def handle(self, *args, **options):
+        while True:
+            updated, failed = self.collect(options['workers'], options['batch_size'])
+            self.stdout.write("{0} pads updated, {1} failed".format(updated, failed))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
@@ -0,0 +1,41 @@
+# coding=utf-8
+from django.core.management.base import BaseCommand, CommandError
+
+from padman.bulk import bulk_create_pads
+from padman.models import Pad, PadCategory, PadServer
+
+
+class Command(BaseCommand):
+    help = "Creates many pads in a category at once"
+
+    def add_arguments(self, parser):
+        parser.add_argument('category', help="Slug of the category")
+        parser.add_argument('server', type=int, help="Id of the pad server")
+        parser.add_argument('names', nargs='*', help="Names of the pads")
+        parser.add_argument('--file', help="Read the names from this file, one per line")
+        parser.add_argument('--text-file', help="Initial text of the pads")
+        parser.add_argument('--template', type=int, help="Id of a template pad to fill the pads from")
+
+    def handle(self, *args, **options):
+        try:
+            category = PadCategory.objects.get(slug=options['category'])
+            server = PadServer.objects.get(pk=options['server'])
+            template = Pad.objects.get(pk=options['template']) if options['template'] else None
+        except (PadCategory.DoesNotExist, PadServer.DoesNotExist, Pad.DoesNotExist) as e:
+            raise CommandError(e)
+
+        names = list(options['names'])
+        if options['file']:
+            with open(options['file']) as f:
+                names += [line.strip() for line in f if line.strip()]
+        text = None
+        if options['text_file']:
+            with open(options['text_file']) as f:
+                text = f.read()
+
+        failed = 0
+        for name, pad, error in bulk_create_pads(category, server, names, text=text, template=template):
+            if error is not None:
+                failed += 1
+                self.stderr.write("{0}: {1}".format(name, error))
+        self.stdout.write("{0} pads created, {1} failed".format(len(names) - failed, failed))
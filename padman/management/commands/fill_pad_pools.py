@@ -0,0 +1,33 @@
+# coding=utf-8
+import time
+
+from django.core.management.base import BaseCommand
+
+from padman.models import Pad
+from padman.pool import fill_pool
+
+
+class Command(BaseCommand):
+    help = "Refills the warm pools of template pads"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help="Keep refilling, pausing this many seconds between runs",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            for template in Pad.objects.filter(is_template=True, template_pool_size__gt=0).select_related('server', 'group'):
+                try:
+                    created, errors = fill_pool(template)
+                except Exception as e:
+                    errors = [e]
+                    created = 0
+                for error in errors:
+                    self.stderr.write("{0}: {1}".format(template, error))
+                if created:
+                    self.stdout.write("{0}: {1} pads created".format(template, created))
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
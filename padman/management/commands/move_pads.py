@@ -0,0 +1,58 @@
+# coding=utf-8
+from django.core.management.base import BaseCommand, CommandError
+
+from padman import config
+from padman.bulk import get_or_create_group
+from padman.models import Pad, PadCategory, PadServer
+from padman.transfer import move_pads
+
+
+class Command(BaseCommand):
+    help = "Moves pads into a category on a pad server, copying their content. Can be repeated to resume."
+
+    def add_arguments(self, parser):
+        parser.add_argument('category', help="Slug of the target category")
+        parser.add_argument('server', type=int, help="Id of the target pad server")
+        parser.add_argument('--from-category', action='append', help="Move the pads of the category with this slug")
+        parser.add_argument('--from-server', type=int, action='append', help="Move the pads on the server with this id")
+        parser.add_argument('--pad', type=int, action='append', help="Move the pad with this id")
+        parser.add_argument(
+            '--workers', type=int, default=config.SERVER_CONCURRENCY,
+            help="Pads moved concurrently",
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Pads loaded from the database at once")
+
+    def handle(self, *args, **options):
+        if not (options['from_category'] or options['from_server'] or options['pad']):
+            raise CommandError("Select the pads to move with --from-category, --from-server or --pad")
+        try:
+            category = PadCategory.objects.get(slug=options['category'])
+            server = PadServer.objects.get(pk=options['server'])
+        except (PadCategory.DoesNotExist, PadServer.DoesNotExist) as e:
+            raise CommandError(e)
+        group = get_or_create_group(category, server)
+
+        # Moved pads no longer match, so running again picks up where an
+        # interrupted run stopped
+        pads = Pad.objects.exclude(group=group).exclude(padid=None).select_related('server', 'group')
+        if options['from_category']:
+            pads = pads.filter(group__parent__slug__in=options['from_category'])
+        if options['from_server']:
+            pads = pads.filter(server__in=options['from_server'])
+        if options['pad']:
+            pads = pads.filter(pk__in=options['pad'])
+
+        moved = failed = 0
+        last = 0
+        while True:
+            batch = list(pads.filter(pk__gt=last).order_by('pk')[:options['batch_size']])
+            if not batch:
+                break
+            last = batch[-1].pk
+            for pad, result, error in move_pads(batch, group, options['workers']):
+                if error is None:
+                    moved += 1
+                else:
+                    failed += 1
+                    self.stderr.write("{0} ({1}): {2}".format(pad, pad.padid, error))
+            self.stdout.write("{0} pads moved, {1} failed".format(moved, failed))
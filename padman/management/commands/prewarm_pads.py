@@ -0,0 +1,29 @@
+# coding=utf-8
+from django.core.management.base import BaseCommand
+
+from padman.models import PadServer
+from padman.prewarm import prewarm_authors, prewarm_groups
+
+
+class Command(BaseCommand):
+    help = "Creates the authors of all users and the groups of all categories on the pad servers in advance"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', type=int, action='append', help="Only prewarm the server with this id")
+        parser.add_argument('--skip-authors', action='store_true', help="Do not create authors")
+        parser.add_argument('--skip-groups', action='store_true', help="Do not create groups")
+
+    def handle(self, *args, **options):
+        servers = PadServer.objects.all()
+        if options['server']:
+            servers = servers.filter(pk__in=options['server'])
+        for server in servers:
+            if not server.check_health():
+                self.stderr.write("{0} is offline".format(server))
+                continue
+            if not options['skip_authors']:
+                created, failed = prewarm_authors(server)
+                self.stdout.write("{0}: {1} authors created, {2} failed".format(server, created, failed))
+            if not options['skip_groups']:
+                created, failed = prewarm_groups(server)
+                self.stdout.write("{0}: {1} groups created, {2} failed".format(server, created, failed))
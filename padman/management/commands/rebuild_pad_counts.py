@@ -0,0 +1,11 @@
+# coding=utf-8
+from django.core.management.base import BaseCommand
+
+from padman.counts import rebuild_pad_counts
+
+
+class Command(BaseCommand):
+    help = "Recomputes the denormalized pad counts of all categories"
+
+    def handle(self, *args, **options):
+        rebuild_pad_counts()
@@ -0,0 +1,149 @@
+# coding=utf-8
+from django.core.management.base import BaseCommand
+
+from padman import config
+from padman.backend.base import PadNotFound
+from padman.counts import adjust_pad_counts
+from padman.concurrency import map_bounded
+from padman.models import Pad, PadGroup, PadServer, PoolPad, normalize_name
+
+
+class Command(BaseCommand):
+    help = "Compares pads and groups in the database with the pad servers and optionally repairs drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', type=int, action='append', help="Only check the server with this id")
+        parser.add_argument(
+            '--workers', type=int, default=config.SERVER_CONCURRENCY,
+            help="Concurrent requests per pad server",
+        )
+        parser.add_argument(
+            '--import-orphans', action='store_true',
+            help="Create database rows for pads that only exist on the server",
+        )
+        parser.add_argument(
+            '--delete-orphans', action='store_true',
+            help="Delete pads that only exist on the server",
+        )
+        parser.add_argument(
+            '--prune', action='store_true',
+            help="Delete database rows of pads that no longer exist on the server",
+        )
+
+    def handle(self, *args, **options):
+        if options['import_orphans'] and options['delete_orphans']:
+            self.stderr.write("--import-orphans and --delete-orphans are mutually exclusive")
+            return
+
+        servers = PadServer.objects.all()
+        if options['server']:
+            servers = servers.filter(pk__in=options['server'])
+        for server in servers:
+            self.reconcile(server, options)
+
+    def reconcile(self, server, options):
+        self.stdout.write("== {0} ({1})".format(server, server.backend_name()))
+        client = server.client
+        workers = options['workers']
+
+        # Fetch the remote state first, so pads created meanwhile show up
+        # as missing (and are verified below) instead of being orphaned
+        remote_groups = client.list_all_groups()
+        groups = list(PadGroup.objects.filter(server=server).exclude(groupID=None))
+        # Groups whose complete remote pad list is known
+        listed = set()
+        if remote_groups is not None:
+            remote_groups = set(remote_groups)
+            local_groups = set(group.groupID for group in groups)
+            for group_id in sorted(remote_groups - local_groups):
+                self.stdout.write("unknown remote group {0}".format(group_id))
+            for group_id in sorted(local_groups - remote_groups):
+                self.stdout.write("missing remote group {0}".format(group_id))
+            listed.update(group.pk for group in groups if group.groupID not in remote_groups)
+            groups = [group for group in groups if group.groupID in remote_groups]
+
+        listings = list(map_bounded(lambda group: client.list_group_pads(group.groupID), groups, workers))
+        if any(error is None and names is None for group, names, error in listings):
+            self.stdout.write("the pads of this server can not be listed, skipped")
+            return
+
+        remote = {}
+        for group, names, error in listings:
+            if error is not None:
+                self.stderr.write("could not list pads of {0}: {1}".format(group.groupID, error))
+                continue
+            listed.add(group.pk)
+            for name in names:
+                remote[client.group_pad_id(group.groupID, name)] = group
+
+        local_pads = dict(
+            (pad.padid, pad) for pad in
+            Pad.objects.filter(server=server, group__in=listed).exclude(padid=None)
+        )
+        local = set(local_pads)
+        # Pooled pads have no Pad row until they are claimed
+        pooled = set(PoolPad.objects.filter(template__server=server).values_list('padid', flat=True))
+        orphans = sorted(set(remote) - local - pooled)
+        missing = sorted(local - set(remote))
+
+        for padid in orphans:
+            self.stdout.write("orphaned remote pad {0}".format(padid))
+        for padid in missing:
+            self.stdout.write("missing remote pad {0}".format(padid))
+        self.stdout.write("{0} orphaned, {1} missing, {2} in sync".format(
+            len(orphans), len(missing), len(local) - len(missing)))
+
+        if options['import_orphans']:
+            self.import_orphans(server, remote, orphans)
+        if options['delete_orphans']:
+            self.delete_orphans(client, orphans, workers)
+        if options['prune']:
+            self.prune(client, [local_pads[padid] for padid in missing], workers)
+
+    def import_orphans(self, server, remote, orphans):
+        # Pads might have been added to the database since the listing
+        orphans = set(orphans) - set(Pad.objects.filter(padid__in=orphans).values_list('padid', flat=True))
+        orphans -= set(PoolPad.objects.filter(padid__in=orphans).values_list('padid', flat=True))
+        pads = []
+        for padid in sorted(orphans):
+            group = remote[padid]
+            name = padid[len(group.groupID) + 1:]
+            pads.append(Pad(name=name, name_normalized=normalize_name(name), padid=padid, server=server, group=group))
+        Pad.objects.bulk_create(pads)
+        # bulk_create does not send signals
+        for group in set(pad.group for pad in pads):
+            adjust_pad_counts(group.parent_id, sum(1 for pad in pads if pad.group == group))
+        self.stdout.write("imported {0} pads".format(len(pads)))
+
+    def delete_orphans(self, client, orphans, workers):
+        # Pads might have been added to the database since the listing
+        orphans = set(orphans) - set(Pad.objects.filter(padid__in=orphans).values_list('padid', flat=True))
+        orphans -= set(PoolPad.objects.filter(padid__in=orphans).values_list('padid', flat=True))
+        deleted = 0
+        for padid, result, error in map_bounded(client.delete_pad, sorted(orphans), workers):
+            if error is not None:
+                self.stderr.write("could not delete {0}: {1}".format(padid, error))
+            elif result:
+                deleted += 1
+        self.stdout.write("deleted {0} orphaned pads".format(deleted))
+
+    def prune(self, client, pads, workers):
+        def gone(pad):
+            # Confirm with a direct lookup, the pad might have been created
+            # after the listing
+            try:
+                client.get_revision(pad.padid)
+            except PadNotFound:
+                return True
+            return False
+
+        confirmed = []
+        for pad, result, error in map_bounded(gone, pads, workers):
+            if error is not None:
+                self.stderr.write("could not check {0}: {1}".format(pad.padid, error))
+            elif result:
+                confirmed.append(pad)
+        # The pads are already gone from the server
+        for pad in confirmed:
+            pad.delete(remote=False)
+        self.stdout.write("pruned {0} pads".format(len(confirmed)))
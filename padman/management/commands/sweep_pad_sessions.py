@@ -0,0 +1,85 @@
+# coding=utf-8
+import time
+
+from django.core.management.base import BaseCommand
+
+from padman import config
+from padman.concurrency import RateLimit, map_bounded
+from padman.models import PadAuthor, PadGroup, PadServer
+
+
+class Command(BaseCommand):
+    help = "Deletes expired sessions from the pad servers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', type=int, action='append', help="Only sweep the server with this id")
+        parser.add_argument(
+            '--workers', type=int, default=config.SERVER_CONCURRENCY,
+            help="Concurrent requests per pad server",
+        )
+        parser.add_argument(
+            '--rate', type=float, default=20,
+            help="Maximum number of sessions deleted per second and server, 0 for no limit",
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Only report the expired sessions")
+        parser.add_argument(
+            '--loop', type=int, metavar='SECONDS',
+            help="Keep sweeping, pausing this many seconds between runs",
+        )
+
+    def handle(self, *args, **options):
+        servers = PadServer.objects.all()
+        if options['server']:
+            servers = servers.filter(pk__in=options['server'])
+        while True:
+            for server in servers:
+                self.sweep(server, options)
+            if not options['loop']:
+                break
+            time.sleep(options['loop'])
+
+    def sweep(self, server, options):
+        client = server.client
+        workers = options['workers']
+
+        # Sessions of groups and authors that were deleted in the database
+        # are still found through the other side
+        sources = [
+            (client.list_group_sessions, group_id) for group_id in
+            PadGroup.objects.filter(server=server).exclude(groupID=None).values_list('groupID', flat=True)
+        ] + [
+            (client.list_author_sessions, author_id) for author_id in
+            PadAuthor.objects.filter(server=server).exclude(authorID='').values_list('authorID', flat=True)
+        ]
+
+        now = time.time()
+        expired = set()
+        for (list_sessions, owner), sessions, error in map_bounded(lambda source: source[0](source[1]), sources, workers):
+            if error is not None:
+                self.stderr.write("could not list sessions of {0}: {1}".format(owner, error))
+                continue
+            if sessions is None:
+                # The backend does not keep sessions
+                return
+            for session_id, session in sessions.items():
+                if session and float(session.get('validUntil') or 0) < now:
+                    expired.add(session_id)
+
+        if options['dry_run']:
+            self.stdout.write("{0}: {1} expired sessions".format(server, len(expired)))
+            return
+
+        limit = RateLimit(options['rate'])
+
+        def delete(session_id):
+            limit.wait()
+            client.delete_session(session_id)
+
+        failed = 0
+        for session_id, result, error in map_bounded(delete, expired, workers):
+            if error is not None:
+                failed += 1
+                self.stderr.write("could not delete session {0}: {1}".format(session_id, error))
+        self.stdout.write("{0}: {1} expired sessions deleted, {2} failed".format(
+            server, len(expired) - failed, failed,
+        ))
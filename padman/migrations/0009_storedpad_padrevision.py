@@ -0,0 +1,48 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('padman', '0008_auto_20180530_2259'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredPad',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('padid', models.CharField(max_length=256, unique=True)),
+                ('groupid', models.CharField(db_index=True, max_length=256)),
+                ('password', models.CharField(blank=True, max_length=100)),
+                ('is_public', models.BooleanField(default=False)),
+                ('head', models.PositiveIntegerField(default=0)),
+                ('last_edited', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'stored pad',
+                'verbose_name_plural': 'stored pads',
+            },
+        ),
+        migrations.CreateModel(
+            name='PadRevision',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rev', models.PositiveIntegerField()),
+                ('keep_head', models.PositiveIntegerField(default=0)),
+                ('keep_tail', models.PositiveIntegerField(default=0)),
+                ('insert', models.TextField(blank=True)),
+                ('snapshot', models.TextField(blank=True, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('pad', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revisions', to='padman.StoredPad')),
+            ],
+            options={
+                'verbose_name': 'revision',
+                'verbose_name_plural': 'revisions',
+                'unique_together': {('pad', 'rev')},
+            },
+        ),
+    ]
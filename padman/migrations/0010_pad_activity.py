@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('padman', '0009_storedpad_padrevision'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pad',
+            name='activity_updated',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pad',
+            name='last_edited',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pad',
+            name='revisions',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='pad',
+            name='user_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('padman', '0010_pad_activity'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pad',
+            index=models.Index(fields=['group', 'name', 'id'], name='padman_pad_group_name'),
+        ),
+        migrations.AddIndex(
+            model_name='pad',
+            index=models.Index(fields=['group', '-last_edited', '-id'], name='padman_pad_group_edited'),
+        ),
+        migrations.AddIndex(
+            model_name='pad',
+            index=models.Index(fields=['group', '-user_count', '-id'], name='padman_pad_group_users'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-19 12:58
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(name):
+    # A copy of padman.models.normalize_name as of this migration
+    name = unicodedata.normalize('NFKD', name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())[:256]
+
+
+def normalize_names(apps, schema_editor):
+    Pad = apps.get_model('padman', 'Pad')
+    db = schema_editor.connection.alias
+    for pad in Pad.objects.using(db).only('name').iterator():
+        Pad.objects.using(db).filter(pk=pad.pk).update(name_normalized=normalize_name(pad.name))
+
+
+def create_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX padman_pad_name_trgm ON padman_pad "
+        "USING gin (name_normalized gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS padman_pad_name_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('padman', '0011_pad_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pad',
+            name='name_normalized',
+            field=models.CharField(default='', editable=False, max_length=256),
+        ),
+        migrations.AddIndex(
+            model_name='pad',
+            index=models.Index(fields=['group', 'name_normalized'], name='padman_pad_group_search'),
+        ),
+        migrations.RunPython(normalize_names, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
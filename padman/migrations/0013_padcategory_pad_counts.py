@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:00
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_pads(apps, schema_editor):
+    Pad = apps.get_model('padman', 'Pad')
+    PadCategory = apps.get_model('padman', 'PadCategory')
+    db = schema_editor.connection.alias
+
+    counts = dict(
+        Pad.objects.using(db).filter(group__parent__isnull=False).order_by()
+        .values_list('group__parent').annotate(count=Count('pk'))
+    )
+    nodes = list(PadCategory.objects.using(db).values_list('pk', 'tree_id', 'lft', 'rght'))
+    for pk, tree_id, lft, rght in nodes:
+        subtree = sum(
+            counts.get(other, 0) for other, other_tree, other_lft, other_rght in nodes
+            if other_tree == tree_id and lft <= other_lft and other_rght <= rght
+        )
+        PadCategory.objects.using(db).filter(pk=pk).update(
+            pad_count=counts.get(pk, 0),
+            subtree_pad_count=subtree,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('padman', '0012_pad_name_normalized'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='padcategory',
+            name='pad_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='padcategory',
+            name='subtree_pad_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_pads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('padman', '0013_padcategory_pad_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pad',
+            name='template_pool_size',
+            field=models.PositiveIntegerField(default=0, help_text='Number of pads kept ready on the server for instant duplication', verbose_name='warm pool size'),
+        ),
+        migrations.CreateModel(
+            name='PoolPad',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('padid', models.CharField(max_length=256)),
+                ('password', models.CharField(blank=True, max_length=100)),
+                ('revision', models.CharField(blank=True, max_length=64, null=True)),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pool', to='padman.Pad')),
+            ],
+            options={
+                'verbose_name': 'pooled pad',
+                'verbose_name_plural': 'pooled pads',
+            },
+        ),
+    ]
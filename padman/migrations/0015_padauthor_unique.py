@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-19 13:36
+
+from django.conf import settings
+from django.db import migrations
+
+
+def remove_duplicate_authors(apps, schema_editor):
+    PadAuthor = apps.get_model('padman', 'PadAuthor')
+    db = schema_editor.connection.alias
+    seen = set()
+    duplicates = []
+    for pk, user_id, server_id in PadAuthor.objects.using(db).order_by('pk').values_list('pk', 'user', 'server'):
+        if (user_id, server_id) in seen:
+            duplicates.append(pk)
+        seen.add((user_id, server_id))
+    PadAuthor.objects.using(db).filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('padman', '0014_poolpad'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_authors, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='padauthor',
+            unique_together={('user', 'server')},
+        ),
+    ]
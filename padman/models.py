@@ -1,22 +1,34 @@
 import string
 import random
 import urllib
+import unicodedata
 
-from django.db import models
-from django.db.models.signals import pre_delete
+from django.core.cache import cache
+from django.db import models, connections, transaction
+from django.db.models.functions import Length
+from django.db.models.signals import pre_delete, post_save, post_delete, m2m_changed
 from django.contrib.auth.models import Group
 from django.contrib.auth import get_user_model
 from django.utils.translation import ugettext_lazy as _
 from django.conf import settings
 
 from mptt.models import MPTTModel, TreeForeignKey
+from mptt.signals import node_moved
 
 from py_etherpad import EtherpadLiteClient
 
 from .backend.etherpadlite import EtherpadLiteBackend
 from .backend.hackmd import HackMDBackend
+from .backend.djangopad import DjangoPadBackend
+from .backend.base import ServerBusy
+from . import config, tree, counts, shortlinks
 
 
+# Backend clients by backend, url and API key
+_clients = {}
+
+HEALTH_KEY = 'padman:health:{0}'
+
 class PadServer(models.Model):
     """Schema and methods for etherpad-lite servers
     """
@@ -51,14 +63,55 @@ class PadServer(models.Model):
     def backend_name(self):
         return [b for a,b in PadServer.BACKEND_CHOICES if a == self.backend][0]
 
-    @property
-    def client(self):
+    def _create_client(self):
         if self.backend == PadServer.ETHERPADLITE:
             return EtherpadLiteBackend(self.apikey, self.url)
         elif self.backend == PadServer.HACKMD:
             return HackMDBackend(self.apikey, self.url)
         else:
-            return BaseBackend()
+            return DjangoPadBackend()
+
+    @property
+    def client(self):
+        # Clients are kept for the lifetime of the process, HackMD logs in
+        # once per thread and again when its login expires
+        key = (self.backend, self.url, self.apikey)
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = self._create_client()
+        return client
+
+    def check_health(self):
+        """Asks the server whether it is online and remembers the answer for
+        HEALTH_CHECK_INTERVAL seconds. A server that is merely busy counts as
+        online, and is asked again next time.
+        """
+        try:
+            online = self.client.is_online()
+        except ServerBusy:
+            return True
+        except Exception:
+            online = False
+        cache.set(HEALTH_KEY.format(self.pk), online, config.HEALTH_CHECK_INTERVAL)
+        return online
+
+    def is_online(self):
+        online = cache.get(HEALTH_KEY.format(self.pk))
+        if online is None:
+            online = self.check_health()
+        return online
+
+    @property
+    def async_client(self):
+        """Returns an asyncio client for this server, see backend.aio
+        """
+        from .backend import aio
+        if self.backend == PadServer.ETHERPADLITE:
+            return aio.AsyncEtherpadLiteBackend(self.apikey, self.url)
+        elif self.backend == PadServer.HACKMD:
+            return aio.AsyncHackMDBackend(self.apikey, self.url)
+        else:
+            return aio.AsyncAdapter(DjangoPadBackend())
 
 
 class PadCategory(MPTTModel):
@@ -71,14 +124,58 @@ class PadCategory(MPTTModel):
 
     groups = models.ManyToManyField(Group)
 
+    # Denormalized pad counts, maintained by padman.counts
+    pad_count = models.PositiveIntegerField(default=0, editable=False)
+    subtree_pad_count = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # Never write back counts that might have changed since loading
+        if not self._state.adding and not kwargs.get('force_insert') and kwargs.get('update_fields') is None:
+            # The MPTT fields are left to MPTT as well
+            kwargs['update_fields'] = [
+                name for name in self._get_user_field_names()
+                if name not in ('pad_count', 'subtree_pad_count')
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _('category')
         verbose_name_plural = _('categories')
 
 
+def categoryChanged(sender, **kwargs):
+    """Drop the cached category tree on inserts, changes, moves and deletions
+    """
+    tree.invalidate_structure()
+
+def categoryMoved(sender, **kwargs):
+    """Moves and deletions change the subtree pad counts of the ancestors
+    """
+    transaction.on_commit(counts.rebuild_subtree_counts)
+
+def categoryGroupsChanged(sender, action, **kwargs):
+    """Drop the cached visibility of categories when their groups change
+    """
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        tree.invalidate_visibility()
+
+post_save.connect(categoryChanged, sender=PadCategory)
+post_delete.connect(categoryChanged, sender=PadCategory)
+node_moved.connect(categoryChanged, sender=PadCategory)
+post_delete.connect(categoryMoved, sender=PadCategory)
+node_moved.connect(categoryMoved, sender=PadCategory)
+m2m_changed.connect(categoryGroupsChanged, sender=PadCategory.groups.through)
+
+
+def authGroupChanged(sender, **kwargs):
+    tree.invalidate_visibility()
+
+post_delete.connect(authGroupChanged, sender=Group)
+
+
 class PadGroup(models.Model):
     """Schema and methods for etherpad-lite groups
     """
@@ -126,14 +223,35 @@ class PadGroup(models.Model):
         users = get_user_model().objects.filter(groups__in=groups)
         return PadAuthor.objects.all().filter(server=self.server, user__in=users);
 
+    def is_member(self, user):
+        """Whether the user may access the pads of this group, the same as
+        having an author among `authors`
+        """
+        if not user.is_authenticated or self.parent_id is None:
+            return False
+        return user.groups.filter(padcategory=self.parent_id).exists()
+
     def _create(self):
         self.groupID = self.server.client.get_or_create_group(self.group_mapper)
 
     def _destroy(self):
-        # First find and delete all associated pads
-        Pad.objects.filter(group=self).delete()
+        # First find and delete all associated pads, removing them from the
+        # server in one batch
+        pads = list(Pad.objects.filter(group=self))
+        for pad in pads:
+            if pad.is_template:
+                from .pool import drain_pool
+                drain_pool(pad)
+            pad.delete(remote=False)
+        self.server.client.delete_pads([pad.padid for pad in pads if pad.padid])
         return self.server.client.delete_group(self.groupID)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
     def save(self, *args, **kwargs):
         if not self.pk:
             self._create()
@@ -141,7 +259,7 @@ class PadGroup(models.Model):
 
     def unknown_pads(self):
         try:
-            return self.server.client.list_group_pads(self.groupID)
+            return self.server.client.list_group_pads(self.groupID) or []
         except:
             return []
 
@@ -155,6 +273,19 @@ def padGroupDel(sender, **kwargs):
 pre_delete.connect(padGroupDel, sender=PadGroup)
 
 
+def padGroupMoved(sender, instance, created, **kwargs):
+    """Moves the pad counts along with a group that changed its category
+    """
+    old_parent_id = getattr(instance, '_loaded_parent_id', None)
+    if not created and old_parent_id != instance.parent_id:
+        num_pads = instance.pad_set.count()
+        counts.adjust_pad_counts(old_parent_id, -num_pads)
+        counts.adjust_pad_counts(instance.parent_id, num_pads)
+    instance._loaded_parent_id = instance.parent_id
+
+post_save.connect(padGroupMoved, sender=PadGroup)
+
+
 def groupDel(sender, **kwargs):
     """Make sure our groups are destroyed properly when auth groups are deleted
     """
@@ -191,6 +322,9 @@ class PadAuthor(models.Model):
     class Meta:
         verbose_name = _('author')
         verbose_name_plural = _('authors')
+        unique_together = (
+            ('user', 'server'),
+        )
 
     def __str__(self):
         return str(self.user)
@@ -208,7 +342,38 @@ class PadAuthor(models.Model):
         super().save(*args, **kwargs)
 
 
-class PadManager(models.Manager):
+# The length normalized names are cut to. Decomposing a name can make it
+# several times longer than the name itself
+NORMALIZED_NAME_LENGTH = 256
+
+def normalize_name(name):
+    """Folds case, accents and whitespace of a pad name for searching
+    """
+    name = unicodedata.normalize('NFKD', name)
+    name = "".join(c for c in name if not unicodedata.combining(c))
+    return " ".join(name.casefold().split())[:NORMALIZED_NAME_LENGTH]
+
+
+class PadQuerySet(models.QuerySet):
+
+    def search_name(self, query):
+        """Filters pads by name and ranks them by similarity to the query.
+        PostgreSQL uses the trigram index on the normalized name, other
+        databases fall back to a prefix range on its B-tree index.
+        """
+        query = normalize_name(query)
+        if connections[self.db].vendor == 'postgresql':
+            from django.contrib.postgres.search import TrigramSimilarity
+            return self.filter(name_normalized__contains=query).annotate(
+                similarity=TrigramSimilarity('name_normalized', query),
+            ).order_by('-similarity', 'pk')
+        return self.filter(
+            name_normalized__gte=query,
+            name_normalized__lt=query + '\U0010ffff',
+        ).order_by(Length('name_normalized'), 'name_normalized', 'pk')
+
+
+class PadManager(models.Manager.from_queryset(PadQuerySet)):
 
     def templates(self, category):
         """Given a category, returns all templates for that category
@@ -225,6 +390,9 @@ class Pad(models.Model):
     # The name of the pad
     name = models.CharField(max_length=256)
 
+    # The name, as used for searching
+    name_normalized = models.CharField(max_length=NORMALIZED_NAME_LENGTH, editable=False, default='')
+
     # The server for this pad
     server = models.ForeignKey(PadServer, on_delete=models.CASCADE)
 
@@ -251,6 +419,26 @@ class Pad(models.Model):
     template_password = models.CharField(max_length=256, blank=True)
     template_padname = models.CharField(max_length=256, blank=True)
     template_slug = models.CharField(max_length=256, blank=True)
+    template_pool_size = models.PositiveIntegerField(
+        _('warm pool size'), default=0,
+        help_text=_('Number of pads kept ready on the server for instant duplication'),
+    )
+
+    # Activity, as last collected from the server
+    revisions = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    last_edited = models.DateTimeField(null=True, blank=True, editable=False, db_index=True)
+    user_count = models.PositiveIntegerField(default=0, editable=False)
+    activity_updated = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of the pads of a group
+            models.Index(fields=['group', 'name', 'id'], name='padman_pad_group_name'),
+            models.Index(fields=['group', '-last_edited', '-id'], name='padman_pad_group_edited'),
+            models.Index(fields=['group', '-user_count', '-id'], name='padman_pad_group_users'),
+            # Prefix search of pad names, see PadQuerySet.search_name
+            models.Index(fields=['group', 'name_normalized'], name='padman_pad_group_search'),
+        ]
 
     def __str__(self):
         return self.name if len(self.name) < 90 else "".join([self.name[0:90],"..."])
@@ -264,27 +452,140 @@ class Pad(models.Model):
         self.server.client.set_public_status(self.padid, self.is_public)
 
     def _destroy(self):
+        if self.is_template:
+            from .pool import drain_pool
+            drain_pool(self)
         self.server.client.delete_pad(self.padid)
 
     def link(self, user_id):
         return self.server.client.get_pad_link(self.padid, user_id)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        return instance
+
     def save(self, *args, **kwargs):
-        if not self.padid:
-            self._create(**kwargs)
-        self._update()
+        self.name_normalized = normalize_name(self.name)
+        # Pads claimed from a warm pool are already set up on the server
+        if kwargs.pop('remote', True):
+            if not self.padid:
+                self._create(**kwargs)
+            self._update()
         # Clear text setter
         kwargs.pop('text',None)
         super(Pad, self).save(*args, **kwargs)
 
+    def delete(self, *args, **kwargs):
+        # Callers deleting many pads remove them from the server themselves
+        self._remote = kwargs.pop('remote', True)
+        return super().delete(*args, **kwargs)
+
 
 def padDel(sender, instance, **kwargs):
     """Make sure pads are purged from the etherpad-lite server on deletion
     """
-    instance._destroy()
+    if getattr(instance, '_remote', True):
+        instance._destroy()
 
 def groupDel(sender, instance, **kwargs):
     instance._destroy()
 
+def padSaved(sender, instance, created, **kwargs):
+    """Keep the pad counts of the categories up to date
+    """
+    old_group_id = getattr(instance, '_loaded_group_id', None)
+    if created:
+        counts.adjust_pad_counts(group_category(instance.group_id), 1)
+    elif old_group_id != instance.group_id:
+        counts.adjust_pad_counts(group_category(old_group_id), -1)
+        counts.adjust_pad_counts(group_category(instance.group_id), 1)
+    instance._loaded_group_id = instance.group_id
+    shortlinks.invalidate(instance)
+
+def padDeleted(sender, instance, **kwargs):
+    counts.adjust_pad_counts(group_category(instance.group_id), -1)
+    shortlinks.invalidate(instance)
+
+def group_category(group_id):
+    return PadGroup.objects.filter(pk=group_id).values_list('parent', flat=True).first()
+
 pre_delete.connect(padDel, sender=Pad)
 pre_delete.connect(groupDel, sender=Group)
+post_save.connect(padSaved, sender=Pad)
+post_delete.connect(padDeleted, sender=Pad)
+
+
+class StoredPad(models.Model):
+    """Schema for pads of the built-in DjangoPad backend
+    """
+
+    # The padid, as handed out by the backend
+    padid = models.CharField(max_length=256, unique=True)
+
+    # The backend group this pad belongs to
+    groupid = models.CharField(max_length=256, db_index=True)
+
+    password = models.CharField(max_length=100, blank=True)
+    is_public = models.BooleanField(default=False)
+
+    # The number of the latest revision
+    head = models.PositiveIntegerField(default=0)
+    last_edited = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('stored pad')
+        verbose_name_plural = _('stored pads')
+
+    def __str__(self):
+        return self.padid
+
+
+class PadRevision(models.Model):
+    """Append-only revision log of a StoredPad. Each revision replaces
+    the text between the first `keep_head` and the last `keep_tail`
+    characters of its predecessor with `insert`. Snapshot revisions also
+    carry the full text.
+    """
+    pad = models.ForeignKey(StoredPad, on_delete=models.CASCADE, related_name='revisions')
+    rev = models.PositiveIntegerField()
+
+    keep_head = models.PositiveIntegerField(default=0)
+    keep_tail = models.PositiveIntegerField(default=0)
+    insert = models.TextField(blank=True)
+
+    snapshot = models.TextField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('revision')
+        verbose_name_plural = _('revisions')
+        unique_together = (
+            ('pad', 'rev'),
+        )
+
+    def __str__(self):
+        return "{0}@{1}".format(self.pad, self.rev)
+
+
+class PoolPad(models.Model):
+    """A pad created and filled from a template in advance, waiting to be
+    claimed by padDuplicate
+    """
+    template = models.ForeignKey(Pad, on_delete=models.CASCADE, related_name='pool')
+    padid = models.CharField(max_length=256)
+
+    # The password as rendered when filling the pad
+    password = models.CharField(max_length=100, blank=True)
+
+    # The revision of the template pad the text was rendered from
+    revision = models.CharField(max_length=64, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = _('pooled pad')
+        verbose_name_plural = _('pooled pads')
+
+    def __str__(self):
+        return self.padid
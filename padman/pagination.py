@@ -0,0 +1,89 @@
+"""
+Keyset pagination for pad listings. Instead of an offset, a page is
+addressed by the sort key of the last row of the previous page, so every
+page is a single index range scan no matter how deep into the listing it is.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+
+
+class KeysetPage(object):
+
+    def __init__(self, object_list, next_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+class KeysetPaginator(object):
+    """Paginates a queryset ordered by `field` (nulls last) and then by
+    primary key, both ascending or both descending
+    """
+
+    def __init__(self, queryset, field, descending=False, per_page=50):
+        self.queryset = queryset
+        self.field = field
+        self.descending = descending
+        self.per_page = per_page
+
+    def get_ordering(self):
+        if self.field == 'pk':
+            return (F('pk').desc() if self.descending else F('pk').asc(),)
+        if self.descending:
+            return (F(self.field).desc(nulls_last=True), F('pk').desc())
+        return (F(self.field).asc(nulls_last=True), F('pk').asc())
+
+    def encode(self, obj):
+        value = None if self.field == 'pk' else getattr(obj, self.field)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        data = json.dumps([value, obj.pk]).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii')
+
+    def decode(self, cursor):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+            if self.field != 'pk' and value is not None:
+                value = self.queryset.model._meta.get_field(self.field).to_python(value)
+            return value, int(pk)
+        except (ValueError, TypeError, UnicodeError, ValidationError):
+            # Garbled, or made for another sort order
+            return None
+
+    def after(self, value, pk):
+        """Returns the condition selecting all rows after the given key
+        """
+        gt = 'lt' if self.descending else 'gt'
+        after_pk = Q(**{'pk__' + gt: pk})
+        if self.field == 'pk':
+            return after_pk
+        if value is None:
+            return Q(**{self.field + '__isnull': True}) & after_pk
+        condition = Q(**{self.field + '__' + gt: value}) | Q(**{self.field: value}) & after_pk
+        if self.queryset.model._meta.get_field(self.field).null:
+            condition |= Q(**{self.field + '__isnull': True})
+        return condition
+
+    def page(self, cursor=None):
+        queryset = self.queryset.order_by(*self.get_ordering())
+        key = self.decode(cursor) if cursor else None
+        if key:
+            queryset = queryset.filter(self.after(*key))
+        object_list = list(queryset[:self.per_page + 1])
+        next_cursor = None
+        if len(object_list) > self.per_page:
+            object_list = object_list[:self.per_page]
+            next_cursor = self.encode(object_list[-1])
+        return KeysetPage(object_list, next_cursor)
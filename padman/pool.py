@@ -0,0 +1,121 @@
+"""
+Warm pools of pads instantiated from templates ahead of time.
+
+A template pad with a `template_pool_size` keeps that many pads created,
+filled and finalized on its server. padDuplicate claims the oldest of them
+and gives it the name and slug it rendered, which only costs a database
+update instead of several calls to the server. Only templates whose text
+does not use the name, slug or password of the new pad are pooled, since
+those are only known when it is claimed. The text keeps the date rendered
+when the pool was filled, so pooled pads older than POOL_MAX_AGE or
+rendered from an outdated revision of the template are discarded by
+`fill_pool`.
+"""
+
+import datetime
+import uuid
+
+from django.db import transaction
+from django.template import Context
+from django.utils import timezone
+
+from . import config, models, templating
+from .backend.base import PadError
+from .concurrency import map_bounded
+
+# Variables only known when a pad is claimed
+CLAIM_VARIABLES = ('name', 'slug', 'password')
+
+
+def _expired(template, revision):
+    entries = models.PoolPad.objects.filter(template=template)
+    oldest = timezone.now() - datetime.timedelta(seconds=config.POOL_MAX_AGE)
+    expired = entries.filter(created__lt=oldest)
+    if revision is not None:
+        expired = expired | entries.exclude(revision=str(revision))
+    return expired
+
+
+def _discard(client, entries):
+    # Delete the rows first, so the pads can not be claimed meanwhile
+    client.delete_pads([
+        entry.padid for entry in entries
+        if models.PoolPad.objects.filter(pk=entry.pk).delete()[0]
+    ])
+
+
+def fill_pool(template):
+    """Discards outdated pooled pads of a template and creates new ones up
+    to its pool size. Returns the number of pads created and the errors
+    that occurred.
+    """
+    client = template.server.client
+    revision = client.get_revision(template.padid)
+    _discard(client, list(_expired(template, revision)))
+
+    text_template = templating.pad_template(template, client)
+    if templating.references(text_template, CLAIM_VARIABLES):
+        drain_pool(template)
+        return 0, [PadError("Templates using the name, slug or password can not be pooled")]
+
+    missing = template.template_pool_size - models.PoolPad.objects.filter(template=template).count()
+    if missing <= 0:
+        return 0, []
+
+    def create(i):
+        date = datetime.datetime.now()
+        password = templating.render_field(template.template_password, Context({}))
+        text = text_template.render(Context({"date": date}))
+        padid = client.create_group_pad(template.group.groupID, "pool-" + uuid.uuid4().hex, text=text)
+        if password:
+            client.set_password(padid, password)
+        client.set_public_status(padid, template.template_is_public)
+        return models.PoolPad.objects.create(
+            template=template,
+            padid=padid,
+            password=password,
+            revision=None if revision is None else str(revision),
+        )
+
+    created = 0
+    errors = []
+    for i, entry, error in map_bounded(create, range(missing), config.SERVER_CONCURRENCY):
+        if error is None:
+            created += 1
+        else:
+            errors.append(error)
+    return created, errors
+
+
+def drain_pool(template):
+    """Deletes all pooled pads of a template
+    """
+    _discard(template.server.client, list(models.PoolPad.objects.filter(template=template)))
+
+
+def claim(template, name, slug, password):
+    """Turns a pooled pad of the template into a regular pad with the given
+    name and slug, or returns None if the pool is empty
+    """
+    oldest = timezone.now() - datetime.timedelta(seconds=config.POOL_MAX_AGE)
+    candidates = models.PoolPad.objects.filter(template=template, created__gte=oldest).order_by('created')
+    for entry in candidates[:5]:
+        # Whoever deletes the row owns the pad. The row is restored if the
+        # pad can not be saved, so the pad does not leak
+        with transaction.atomic():
+            if not models.PoolPad.objects.filter(pk=entry.pk).delete()[0]:
+                continue
+            if entry.password != password:
+                template.server.client.set_password(entry.padid, password)
+            pad = models.Pad(
+                name=name,
+                slug=slug,
+                password=password,
+                server=template.server,
+                group=template.group,
+                padid=entry.padid,
+                is_public=template.template_is_public,
+            )
+            pad.save(remote=False)
+        return pad
+    return None
@@ -0,0 +1,83 @@
+"""
+Setting up pad servers ahead of time.
+
+Without it, the first visit of a user to a server creates their author and
+the first pad of a category on a server creates its group, both while the
+user waits, and after adding a server or migrating everybody does so at
+once. `prewarm_authors` and `prewarm_groups` create all of them in bulk
+instead. `warm_clients` creates the backend clients of a process and checks
+the health of their servers, web processes can run it in the background
+with `warm_in_background` from their WSGI or ASGI entrypoint.
+"""
+
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+
+from . import config, models
+from .concurrency import map_bounded
+
+
+def prewarm_authors(server):
+    """Creates the missing authors of all users that may access pads on the
+    server. Returns the number of authors created and failed.
+    """
+    users = list(
+        get_user_model().objects
+        .filter(groups__padcategory__isnull=False)
+        .exclude(padauthor__server=server)
+        .distinct()
+    )
+    author_ids = server.client.create_users([(str(user.pk), str(user)) for user in users])
+    authors = [
+        models.PadAuthor(user=user, server=server, authorID=author_ids[str(user.pk)])
+        for user in users if author_ids.get(str(user.pk))
+    ]
+    # Authors created by concurrent requests meanwhile are kept
+    created = len(authors)
+    models.PadAuthor.objects.bulk_create(authors, ignore_conflicts=True)
+    return created, len(users) - created
+
+
+def prewarm_groups(server):
+    """Creates the missing groups of all categories on the server. Returns
+    the number of groups created and failed.
+    """
+    mappers = models.PadGroup.objects.filter(server=server).values_list('group_mapper', flat=True)
+    categories = list(models.PadCategory.objects.exclude(padgroup__server=server).exclude(slug__in=mappers))
+    group_ids = server.client.get_or_create_groups([category.slug for category in categories])
+    groups = [
+        models.PadGroup(
+            server=server,
+            parent=category,
+            group_mapper=category.slug,
+            name=category.name,
+            groupID=group_ids[category.slug],
+        )
+        for category in categories if group_ids.get(category.slug)
+    ]
+    # New groups have no pads, so the pad counts stay the same
+    models.PadGroup.objects.bulk_create(groups, ignore_conflicts=True)
+    return len(groups), len(categories) - len(groups)
+
+
+def warm_clients():
+    """Creates the clients of all pad servers and checks their health
+    """
+    servers = list(models.PadServer.objects.all())
+    for server, online, error in map_bounded(lambda server: server.check_health(), servers, config.SERVER_CONCURRENCY):
+        pass
+
+
+def _warm():
+    try:
+        warm_clients()
+    except Exception:
+        # E.g. the database is not migrated yet
+        pass
+    finally:
+        connections.close_all()
+
+def warm_in_background():
+    threading.Thread(target=_warm, name='padman-prewarm', daemon=True).start()
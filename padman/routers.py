@@ -0,0 +1,91 @@
+"""
+Routes reads of padman models to a read replica.
+
+Only reads made while handling a request through PrimaryStickinessMiddleware
+go to config.READ_REPLICA. Everything else, such as management commands and
+background threads, reads from the default database like before. Once a
+request changes a padman table, its remaining reads go to the default
+database, and a cookie keeps the following requests of the user there for
+config.PRIMARY_STICKINESS seconds.
+"""
+
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import config
+
+STICKY_COOKIE = 'padman_primary'
+
+_request = ContextVar('padman_request', default=None)
+
+
+class _RequestState(object):
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Wraps the queries of the request on the default database. Django
+        # also picks the write database for reads such as get_or_create, so
+        # only statements that actually change padman tables count as writes
+        result = execute(sql, params, many, context)
+        if not self.wrote and 'padman_' in sql and not sql.lstrip()[:6].upper() == 'SELECT':
+            self.pinned = self.wrote = True
+        return result
+
+
+class PadmanRouter(object):
+
+    def _routed(self, model):
+        return config.READ_REPLICA and model._meta.app_label == 'padman'
+
+    def db_for_read(self, model, **hints):
+        if not self._routed(model):
+            return None
+        state = _request.get()
+        if state is None or state.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return config.READ_REPLICA
+
+    def db_for_write(self, model, **hints):
+        if not self._routed(model):
+            return None
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not config.READ_REPLICA:
+            return None
+        databases = (DEFAULT_DB_ALIAS, config.READ_REPLICA)
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if config.READ_REPLICA and db == config.READ_REPLICA and app_label == 'padman':
+            return False
+        return None
+
+
+class PrimaryStickinessMiddleware(object):
+    """Lets PadmanRouter read from the replica during a request, unless the
+    user wrote recently
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not config.READ_REPLICA:
+            return self.get_response(request)
+        state = _RequestState(pinned=STICKY_COOKIE in request.COOKIES)
+        token = _request.set(state)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(state):
+                response = self.get_response(request)
+        finally:
+            _request.reset(token)
+        if state.wrote:
+            response.set_cookie(STICKY_COOKIE, '1', max_age=config.PRIMARY_STICKINESS, httponly=True)
+        return response
@@ -0,0 +1,209 @@
+"""
+Etherpad sessions of the current user.
+
+A user gets one session per pad group they may access, all expiring
+together. They are kept in the Django session, separately for every pad
+server so that switching between servers keeps them, and handed to the pad
+server in the `sessionID` cookie of its host. Expiry times are jittered,
+and sessions that expire within SESSION_RENEWAL_WINDOW are renewed in the
+background: the new set is left in the cache for the next request to pick
+up, while the old sessions stay valid until they expire on their own. The
+Django session is only written, and the cookie only sent, when the
+sessions change.
+
+Every session is also shared in the cache under its author and group, so
+the other browsers and devices of a user reuse it instead of creating their
+own.
+"""
+
+import datetime
+import random
+import time
+from urllib.parse import urlparse
+
+from django.core.cache import cache
+
+from . import config, models
+from .concurrency import run_in_background
+
+RENEWAL_KEY = 'padman:sessions:renewal:{0}'
+RENEWING_KEY = 'padman:sessions:renewing:{0}'
+SHARED_KEY = 'padman:sessions:shared:{0}:{1}'
+
+def _expiry(now):
+    return int(now + config.SESSION_LENGTH - random.randint(0, config.SESSION_JITTER))
+
+
+def _get_states(request):
+    states = request.session.get('etherpad')
+    if not states or 'expires' in states:
+        # No sessions yet, or state in an older format
+        return {}
+    return states
+
+def get_state(request, pad_server):
+    """Returns the session state of the current user on a pad server: when
+    the sessions expire, the cookie domain and the session ids by group id
+    """
+    state = _get_states(request).get(str(pad_server.pk))
+    if not state or 'sessions' not in state:
+        return {'expires': 0, 'domain': None, 'sessions': {}}
+    return state
+
+def save_state(request, pad_server, state):
+    """Stores the session state of the current user on a pad server, and
+    drops the expired state of other servers. Only writes the session when
+    something changed.
+    """
+    now = time.time()
+    states = _get_states(request)
+    new_states = dict(
+        (server_id, server_state) for server_id, server_state in states.items()
+        if server_state.get('expires', 0) > now
+    )
+    new_states[str(pad_server.pk)] = state
+    if new_states != states:
+        request.session['etherpad'] = new_states
+
+def created_sessions(session_ids):
+    """Drops the groups a session could not be created for from the result
+    of `create_sessions`
+    """
+    return dict((group_id, session_id) for group_id, session_id in session_ids.items() if session_id)
+
+def _create_sessions(client, author, group_ids, expires):
+    return created_sessions(client.create_sessions(group_ids, author.authorID, int(expires)))
+
+
+def share_sessions(author, session_ids, expires):
+    """Offers newly created sessions, by group id, to the other devices of
+    the author
+    """
+    timeout = int(expires - time.time())
+    if session_ids and timeout > 0:
+        cache.set_many(dict(
+            (SHARED_KEY.format(author.pk, group_id), {'sessionID': session_id, 'expires': expires})
+            for group_id, session_id in session_ids.items()
+        ), timeout)
+
+def _shared_sessions(author, group_ids, now):
+    keys = dict((SHARED_KEY.format(author.pk, group_id), group_id) for group_id in group_ids)
+    shared = cache.get_many(list(keys))
+    # Sessions about to be renewed are not worth picking up
+    return dict(
+        (keys[key], shared_session) for key, shared_session in shared.items()
+        if shared_session['expires'] - now > config.SESSION_RENEWAL_WINDOW
+    )
+
+def forget_sessions(author, group_ids):
+    cache.delete_many([SHARED_KEY.format(author.pk, group_id) for group_id in group_ids])
+
+
+def renew_sessions(author_id):
+    """Creates a new set of sessions for an author and leaves it in the
+    cache for the next request
+    """
+    try:
+        author = models.PadAuthor.objects.select_related('server').get(pk=author_id)
+        client = author.server.client
+        now = time.time()
+        expires = _expiry(now)
+        group_ids = [group.groupID for group in author.groups]
+        renewed = _create_sessions(client, author, group_ids, expires)
+        share_sessions(author, renewed, expires)
+        cache.set(RENEWAL_KEY.format(author_id), {'expires': expires, 'sessions': renewed}, int(expires - now))
+    finally:
+        cache.delete(RENEWING_KEY.format(author_id))
+
+
+def plan_sessions(request, author):
+    """Works out the sessions a user should have without calling the pad
+    server. Returns the new session state, the ids of the groups that still
+    need a session and the sessions to delete by group id.
+    """
+    server = urlparse(author.server.url)
+    now = time.time()
+    state = get_state(request, author.server)
+    sessions = dict(state['sessions'])
+    expires = state['expires']
+    stale = {}
+
+    renewed = cache.get(RENEWAL_KEY.format(author.pk))
+    if renewed is not None and renewed['expires'] > expires:
+        # The old sessions stay valid until they expire
+        stale = sessions if expires > now else {}
+        sessions = dict(renewed['sessions'])
+        expires = renewed['expires']
+    elif expires <= now:
+        sessions = {}
+        expires = _expiry(now)
+    elif expires - now < config.SESSION_RENEWAL_WINDOW:
+        if cache.add(RENEWING_KEY.format(author.pk), True, 60):
+            run_in_background(renew_sessions, author.pk)
+
+    # Provide valid sessions for all groups, only groups the user just
+    # joined need a new one here
+    new_sessions = {}
+    missing = []
+    for group in author.groups:
+        if group.groupID in sessions:
+            new_sessions[group.groupID] = sessions.pop(group.groupID)
+        elif group.groupID not in new_sessions:
+            missing.append(group.groupID)
+        stale.pop(group.groupID, None)
+
+    # Reuse the sessions of other devices, all sessions then expire with
+    # the earliest of them
+    if missing:
+        shared = _shared_sessions(author, missing, now)
+        for group_id, shared_session in shared.items():
+            new_sessions[group_id] = shared_session['sessionID']
+            expires = min(expires, shared_session['expires'])
+        missing = [group_id for group_id in missing if group_id not in shared]
+
+    # Invalidate sessions of groups the user left
+    stale.update(sessions)
+    return {'expires': expires, 'domain': server.hostname, 'sessions': new_sessions}, missing, stale
+
+def update_request(request, pad_server):
+    """Updates the session to reflect the users group membership
+    """
+
+    author = models.PadAuthor.objects.current(pad_server, request.user)
+    if author and pad_server.is_online():
+        client = pad_server.client
+        state, missing, stale = plan_sessions(request, author)
+        if missing:
+            created = _create_sessions(client, author, missing, state['expires'])
+            share_sessions(author, created, state['expires'])
+            state['sessions'].update(created)
+        if stale:
+            client.delete_sessions(list(stale.values()))
+            forget_sessions(author, stale)
+        save_state(request, pad_server, state)
+
+def update_response(request, response, pad_server):
+    if request.user.is_authenticated:
+        state = get_state(request, pad_server)
+        if not state['domain']:
+            return response
+        # Servers on the same host share the cookie
+        now = time.time()
+        states = [
+            server_state for server_state in _get_states(request).values()
+            if server_state.get('domain') == state['domain'] and server_state.get('expires', 0) > now
+        ]
+        value = '%2C'.join(
+            session_id for server_state in states for session_id in server_state['sessions'].values()
+        )
+        expires = max([server_state['expires'] for server_state in states] or [state['expires']])
+        # Only send the cookie when the browser does not have it yet
+        if value != request.COOKIES.get('sessionID', ''):
+            response.set_cookie(
+                'sessionID',
+                value=value,
+                expires=datetime.datetime.utcfromtimestamp(expires),
+                domain=state['domain'],
+                httponly=False
+            )
+    return response
@@ -0,0 +1,63 @@
+"""
+Cached resolution of pad shortlinks.
+
+Slugs and category/name paths are mapped to pad ids in the cache, so
+resolving a shortlink is a primary key lookup. The pad is checked against
+the link after loading it, which catches pads renamed or moved without
+their signals firing. Saving or deleting a pad drops its entries.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.shortcuts import get_object_or_404
+
+from . import config
+
+SLUG_KEY = 'padman:shortlinks:slug:{0}'
+MAPPER_KEY = 'padman:shortlinks:mapper:{0}'
+
+
+def _slug_key(slug):
+    return SLUG_KEY.format(hashlib.md5(slug.encode('utf-8')).hexdigest())
+
+def _mapper_key(group_mapper, name):
+    path = '\n'.join((group_mapper, name))
+    return MAPPER_KEY.format(hashlib.md5(path.encode('utf-8')).hexdigest())
+
+
+def _resolve(key, matches, **lookup):
+    from .models import Pad
+
+    pads = Pad.objects.select_related('group', 'server')
+    pk = cache.get(key)
+    if pk is not None:
+        pad = pads.filter(pk=pk).first()
+        if pad is not None and matches(pad):
+            return pad
+    pad = get_object_or_404(pads, **lookup)
+    cache.set(key, pad.pk, config.SHORTLINK_CACHE_TIMEOUT)
+    return pad
+
+def resolve_slug(slug):
+    """Returns the pad with the slug or raises Http404
+    """
+    return _resolve(_slug_key(slug), lambda pad: pad.slug == slug, slug=slug)
+
+def resolve_mapper(group_mapper, name):
+    """Returns the pad with the name in a group of the category, or raises
+    Http404
+    """
+    return _resolve(
+        _mapper_key(group_mapper, name),
+        lambda pad: pad.name == name and pad.group.group_mapper == group_mapper,
+        group__group_mapper=group_mapper,
+        name=name,
+    )
+
+
+def invalidate(pad):
+    keys = [_mapper_key(pad.group.group_mapper, pad.name)]
+    if pad.slug:
+        keys.append(_slug_key(pad.slug))
+    cache.delete_many(keys)
@@ -0,0 +1,146 @@
+"""
+Compiled templates for instantiating template pads (see padDuplicate).
+
+Templates are compiled once per process and kept in a small LRU cache,
+the text of a template pad keyed by its revision, so an unchanged template
+pad is neither fetched nor parsed again. Templates that only consist of
+literal text and plain `{{ variable }}` substitutions skip the template
+engine altogether (unless TEMPLATE_FAST_PATH is off): they never evaluate
+attributes, filters or tags.
+
+The backends only accept complete texts, so a pad is still rendered into
+a single string rather than streamed to the server.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+from django.template import Engine, Template, TemplateSyntaxError
+from django.template.base import Variable, VariableDoesNotExist, render_value_in_context
+
+from . import config
+
+# A substitution the fast path understands. Anything but an identifier,
+# e.g. a number, is left to the engine
+VARIABLE = re.compile(r'{{\s*([A-Za-z]\w*)\s*}}')
+
+# The start of any other template syntax
+SYNTAX = re.compile(r'{[{%#]')
+
+# Any substitution or tag
+TAG = re.compile(r'{[{%](.*?)[}%]}', re.S)
+
+
+class SimpleTemplate(object):
+    """Template made of literal text and plain variables only
+    """
+
+    def __init__(self, source):
+        # Literals at even, variables at odd indexes. They are resolved the
+        # way the engine does, e.g. `True` is a literal and callables are
+        # called
+        self.parts = VARIABLE.split(source)
+        for i in range(1, len(self.parts), 2):
+            self.parts[i] = Variable(self.parts[i])
+
+    @classmethod
+    def parse(cls, source):
+        """Returns a SimpleTemplate, or None if the source needs the engine
+        """
+        if SYNTAX.search(VARIABLE.sub('', source)):
+            return None
+        try:
+            return cls(source)
+        except TemplateSyntaxError:
+            return None
+
+    def resolve(self, variable, context):
+        try:
+            value = variable.resolve(context)
+        except VariableDoesNotExist:
+            invalid = Engine.get_default().string_if_invalid
+            return invalid % variable.var if '%s' in invalid else invalid
+        return render_value_in_context(value, context)
+
+    def references(self, names):
+        return any(part.lookups and part.lookups[0] in names for part in self.parts[1::2])
+
+    def render(self, context):
+        return "".join(
+            part if i % 2 == 0 else self.resolve(part, context)
+            for i, part in enumerate(self.parts)
+        )
+
+
+def references(template, names):
+    """Whether a compiled template may use one of the variable `names`.
+    Errs on the side of yes for templates that need the engine.
+    """
+    if isinstance(template, SimpleTemplate):
+        return template.references(names)
+    pattern = re.compile(r'\b(?:{0})\b'.format("|".join(map(re.escape, names))))
+    return any(pattern.search(tag) for tag in TAG.findall(template.source))
+
+
+def compile_template(source):
+    if config.TEMPLATE_FAST_PATH:
+        template = SimpleTemplate.parse(source)
+        if template is not None:
+            return template
+    return Template(source)
+
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _lookup(key):
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+def _store(key, source):
+    template = compile_template(source)
+    with _lock:
+        _cache[key] = template
+        while len(_cache) > config.TEMPLATE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return template
+
+def cached_template(key, load):
+    """Returns the compiled template stored under `key`, compiling the
+    source returned by `load()` on a miss
+    """
+    template = _lookup(key)
+    if template is None:
+        template = _store(key, load())
+    return template
+
+
+def render_field(source, context):
+    """Renders one of the short template settings of a pad
+    """
+    return cached_template(('field', source), lambda: source).render(context)
+
+def pad_template(pad, client):
+    """Returns the compiled text of a template pad
+    """
+    revision = client.get_revision(pad.padid)
+    if revision is None:
+        return compile_template(client.get_text(pad.padid))
+    key = ('pad', pad.server_id, pad.padid, revision)
+    return cached_template(key, lambda: client.get_text(pad.padid))
+
+async def async_pad_template(pad, client):
+    """Like `pad_template`, for an asyncio backend client
+    """
+    revision = await client.get_revision(pad.padid)
+    if revision is None:
+        return compile_template(await client.get_text(pad.padid))
+    key = ('pad', pad.server_id, pad.padid, revision)
+    template = _lookup(key)
+    if template is None:
+        template = _store(key, await client.get_text(pad.padid))
+    return template
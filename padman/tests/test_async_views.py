@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+
+import django
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+
+from padman.models import Pad, PadCategory, PadGroup, PadServer
+
+
+class SearchClient(object):
+
+    def __init__(self, result):
+        self.result = result
+
+    async def search(self, group_id, query):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+@unittest.skipIf(django.VERSION < (3, 1), "The async views require Django 3.1 or newer")
+@override_settings(ROOT_URLCONF='padman.tests.async_urls')
+class AsyncViewsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.category = PadCategory.objects.create(name='notes', slug='notes')
+        self.servers = [
+            PadServer.objects.create(title='one', url='http://one.local/', apikey='x'),
+            PadServer.objects.create(title='two', url='http://two.local/', apikey='x'),
+        ]
+        self.groups = [
+            PadGroup.objects.create(server=server, parent=self.category, group_mapper='notes', name='notes')
+            for server in self.servers
+        ]
+        self.template = Pad(name='template', server=self.servers[0], group=self.groups[0], is_template=True)
+        self.template.save()
+
+    def join(self):
+        group = Group.objects.create(name='editors')
+        self.user.groups.add(group)
+        self.category.groups.add(group)
+
+    async def testSearchRequiresLogin(self):
+        response = await self.async_client.get('/notes/~search/?query=x')
+        self.assertEqual(response.status_code, 302)
+
+    async def testSearchSkipsFailedServers(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        clients = {
+            self.servers[0].pk: SearchClient([{'pad': self.template.padid, 'matches': ['x']}]),
+            self.servers[1].pk: SearchClient(ValueError("down")),
+        }
+        with mock.patch.object(PadServer, 'async_client', property(lambda server: clients[server.pk])):
+            response = await self.async_client.get('/notes/~search/?query=x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result['pad'] for result in response.context['pads']], [self.template])
+
+    async def testDuplicateRequiresMembership(self):
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get('/pad/{0}/duplicate/'.format(self.template.pk))
+        self.assertEqual(response.status_code, 403)
+
+    async def testDuplicate(self):
+        await sync_to_async(self.join)()
+        await sync_to_async(self.async_client.force_login)(self.user)
+        response = await self.async_client.get('/pad/{0}/duplicate/'.format(self.template.pk))
+        self.assertEqual(response.status_code, 302)
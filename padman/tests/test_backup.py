@@ -0,0 +1,42 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from padman.models import Pad, PadCategory, PadGroup, PadServer
+
+
+class BackupTestCase(TransactionTestCase):
+
+    def setUp(self):
+        server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        group = PadGroup.objects.create(server=server, parent=category, group_mapper='notes', name='notes')
+        self.pads = []
+        for name in ('first', 'second'):
+            pad = Pad(name=name, server=server, group=group)
+            pad.save()
+            server.client.set_text(pad.padid, 'text of ' + name)
+            self.pads.append(pad)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def backup(self):
+        out = StringIO()
+        call_command('backup_pads', self.directory, '--workers', '1', stdout=out, stderr=out)
+        with open(os.path.join(self.directory, 'manifest.json')) as f:
+            return out.getvalue(), json.load(f)
+
+    def testBackup(self):
+        out, manifest = self.backup()
+        self.assertIn("2 pads fetched, 0 unchanged, 0 failed", out)
+        self.assertEqual(manifest[str(self.pads[0].pk)]['name'], 'first')
+
+        self.pads[1].server.client.set_text(self.pads[1].padid, 'changed')
+        out, manifest = self.backup()
+        self.assertIn("1 pads fetched, 1 unchanged, 0 failed", out)
+        self.assertEqual(set(manifest), set(str(pad.pk) for pad in self.pads))
@@ -0,0 +1,41 @@
+from unittest import mock
+
+from django.test import TransactionTestCase
+
+from padman import config
+from padman.backend.base import PadError
+from padman.bulk import bulk_create_pads
+from padman.models import Pad, PadCategory, PadServer
+
+
+# SQLite's shared in-memory test database locks up concurrent writers
+@mock.patch.object(config, 'SERVER_CONCURRENCY', 1)
+class BulkCreateTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        self.category = PadCategory.objects.create(name='course', slug='course')
+
+    def create(self, names):
+        return sorted(
+            (name, str(error) if error else '') for name, pad, error in
+            bulk_create_pads(self.category, self.server, names, text='hello')
+        )
+
+    def testCreate(self):
+        self.assertEqual(self.create(['Alice', 'Bob']), [('Alice', ''), ('Bob', '')])
+        pads = Pad.objects.filter(group__parent=self.category).order_by('name')
+        self.assertEqual([pad.name for pad in pads], ['Alice', 'Bob'])
+        self.assertEqual(self.server.client.get_text(pads[0].padid), 'hello')
+        self.assertEqual(PadCategory.objects.get(pk=self.category.pk).pad_count, 2)
+
+    def testCollisions(self):
+        self.create(['a b'])
+        self.assertEqual(self.create(['a b', 'a_b', 'c d', 'c_d', 'c d']), [
+            ('a b', "Pad already exists"),
+            ('a_b', "Pad already exists"),
+            ('c d', ''),
+            ('c d', "Pad already exists"),
+            ('c_d', str(PadError("Pad name collides with", 'c d'))),
+        ])
+        self.assertEqual(Pad.objects.filter(group__parent=self.category).count(), 2)
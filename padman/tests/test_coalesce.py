@@ -0,0 +1,109 @@
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from padman import config
+from padman.backend.base import SingleFlight, fresh
+from padman.backend.etherpadlite import EtherpadLiteBackend
+
+
+class SingleFlightTestCase(SimpleTestCase):
+
+    def follow(self, flight, key, func, timeout):
+        results = []
+        thread = threading.Thread(target=lambda: results.append(flight.do(key, func, timeout)))
+        thread.start()
+        return thread, results
+
+    def testShared(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append('leader')
+            release.wait(5)
+            return 'shared'
+        thread, results = self.follow(flight, 'key', slow, None)
+        while not calls:
+            pass
+        follower, followed = self.follow(flight, 'key', lambda: calls.append('follower'), None)
+        release.set()
+        thread.join()
+        follower.join()
+        self.assertEqual(calls, ['leader'])
+        self.assertEqual(results + followed, ['shared', 'shared'])
+
+    def testWaitTimeout(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        started = threading.Event()
+
+        def stuck():
+            started.set()
+            release.wait(5)
+            return 'late'
+        thread, results = self.follow(flight, 'key', stuck, None)
+        started.wait(5)
+        try:
+            self.assertEqual(flight.do('key', lambda: 'direct', 0.01), 'direct')
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(results, ['late'])
+
+
+@mock.patch.object(config, 'COALESCE_CACHE_TIMEOUT', 0)
+class CoalesceKeyTestCase(SimpleTestCase):
+
+    def testAccounts(self):
+        # Calls with different API keys are made at the same time instead of
+        # sharing a result
+        both = threading.Barrier(2, timeout=5)
+
+        def get_text(client):
+            def call(pad_id):
+                both.wait()
+                return {'text': client.apikey}
+            return call
+
+        results = {}
+        threads = []
+        for apikey in ('one', 'two'):
+            client = EtherpadLiteBackend(apikey, 'http://pads.local/')
+            client.epclient = mock.Mock(getText=get_text(client))
+            thread = threading.Thread(target=lambda c=client: results.update({c.apikey: c.get_text('g$pad')}))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {'one': 'one', 'two': 'two'})
+
+
+@mock.patch.object(config, 'COALESCE_CACHE_TIMEOUT', 60)
+class CoalesceCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = EtherpadLiteBackend('key', 'http://pads.local/')
+        self.texts = iter(['first', 'second'])
+        self.client.epclient = mock.Mock(
+            getText=lambda pad_id: {'text': next(self.texts)},
+            createGroupIfNotExistsFor=mock.Mock(return_value={'groupID': 'g.1'}),
+        )
+
+    def testTextsAreNotCached(self):
+        self.assertEqual(self.client.get_text('g.1$pad'), 'first')
+        self.assertEqual(self.client.get_text('g.1$pad'), 'second')
+
+    def testIdsAreCached(self):
+        other = EtherpadLiteBackend('key', 'http://pads.local/')
+        self.assertEqual(self.client.get_or_create_group('notes'), 'g.1')
+        self.assertEqual(other.get_or_create_group('notes'), 'g.1')
+        self.assertEqual(self.client.epclient.createGroupIfNotExistsFor.call_count, 1)
+
+    def testFresh(self):
+        self.assertEqual(fresh(self.client.get_text)('g.1$pad'), 'first')
+        self.assertEqual(fresh(self.client.get_revision), self.client.get_revision)
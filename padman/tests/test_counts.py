@@ -0,0 +1,96 @@
+from django.test import TestCase, TransactionTestCase
+
+from padman import counts
+from padman.models import Pad, PadCategory, PadGroup, PadServer
+
+
+class PadCategorySaveTestCase(TestCase):
+    """Saving a category must not write back stale counts or tree fields
+    """
+
+    def setUp(self):
+        self.root = PadCategory.objects.create(name='root', slug='root')
+        self.a = PadCategory.objects.create(name='a', slug='a', parent=self.root)
+        self.child = PadCategory.objects.create(name='child', slug='child', parent=self.a)
+
+    def testStaleTreeFields(self):
+        stale = PadCategory.objects.get(pk=self.a.pk)
+        sibling = PadCategory(name='b', slug='b')
+        PadCategory.objects.insert_node(sibling, self.a, position='left', save=True)
+
+        stale.name = 'renamed'
+        stale.save()
+
+        a = PadCategory.objects.get(pk=self.a.pk)
+        child = PadCategory.objects.get(pk=self.child.pk)
+        self.assertEqual(a.name, 'renamed')
+        self.assertGreater(a.lft, PadCategory.objects.get(pk=sibling.pk).rght)
+        self.assertTrue(a.lft < child.lft < child.rght < a.rght)
+
+    def testStaleCounts(self):
+        stale = PadCategory.objects.get(pk=self.child.pk)
+        counts.adjust_pad_counts(self.child.pk, 2)
+
+        stale.name = 'renamed'
+        stale.save()
+
+        child = PadCategory.objects.get(pk=self.child.pk)
+        self.assertEqual(child.pad_count, 2)
+        self.assertEqual(child.subtree_pad_count, 2)
+        self.assertEqual(PadCategory.objects.get(pk=self.root.pk).subtree_pad_count, 2)
+
+
+class PadCountsTestCase(TransactionTestCase):
+    """Pad changes keep the counts of their category and its ancestors
+    """
+
+    def setUp(self):
+        self.server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        self.root = PadCategory.objects.create(name='root', slug='root')
+        self.a = PadCategory.objects.create(name='a', slug='a', parent=self.root)
+        self.b = PadCategory.objects.create(name='b', slug='b', parent=self.root)
+        self.group_a = self.make_group(self.a)
+        self.group_b = self.make_group(self.b)
+
+    def make_group(self, category):
+        return PadGroup.objects.create(server=self.server, parent=category, group_mapper=category.slug, name=category.name)
+
+    def make_pad(self, group, name='pad'):
+        pad = Pad(name=name, server=self.server, group=group)
+        pad.save()
+        return pad
+
+    def assertCounts(self, expected):
+        actual = dict(
+            (name, (pad_count, subtree_pad_count)) for name, pad_count, subtree_pad_count in
+            PadCategory.objects.values_list('name', 'pad_count', 'subtree_pad_count')
+        )
+        self.assertEqual(actual, expected)
+
+    def testCreateAndDelete(self):
+        pad = self.make_pad(self.group_a)
+        self.make_pad(self.group_a, 'other')
+        self.make_pad(self.group_b)
+        self.assertCounts({'root': (0, 3), 'a': (2, 2), 'b': (1, 1)})
+        pad.delete()
+        self.assertCounts({'root': (0, 2), 'a': (1, 1), 'b': (1, 1)})
+
+    def testMovePad(self):
+        pad = self.make_pad(self.group_a)
+        pad.group = self.group_b
+        pad.save()
+        self.assertCounts({'root': (0, 1), 'a': (0, 0), 'b': (1, 1)})
+
+    def testMoveCategory(self):
+        self.make_pad(self.group_a)
+        self.make_pad(self.group_b)
+        b = PadCategory.objects.get(pk=self.b.pk)
+        b.parent = PadCategory.objects.get(pk=self.a.pk)
+        b.save()
+        self.assertCounts({'root': (0, 2), 'a': (1, 2), 'b': (1, 1)})
+
+    def testRebuild(self):
+        self.make_pad(self.group_a)
+        PadCategory.objects.update(pad_count=5, subtree_pad_count=7)
+        counts.rebuild_pad_counts()
+        self.assertCounts({'root': (0, 1), 'a': (1, 1), 'b': (0, 0)})
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from padman import config
+from padman.backend.djangopad import apply_splice, splice
+from padman.models import PadRevision, PadServer, StoredPad
+
+
+class SpliceTestCase(TestCase):
+
+    def assertRoundTrip(self, old, new):
+        head, tail, insert = splice(old, new)
+        self.assertEqual(apply_splice(old, head, tail, insert), new)
+
+    def testSplice(self):
+        self.assertEqual(splice("abcdef", "abXYef"), (2, 2, "XY"))
+        self.assertEqual(splice("abc", "abc"), (3, 0, ""))
+        self.assertEqual(splice("", "abc"), (0, 0, "abc"))
+        self.assertEqual(splice("abc", ""), (0, 0, ""))
+
+    def testOverlap(self):
+        # Head and tail never claim the same characters twice
+        self.assertEqual(splice("aa", "aaa"), (2, 0, "a"))
+        self.assertEqual(splice("aaa", "aa"), (2, 0, ""))
+
+    def testRoundTrip(self):
+        for old, new in [("", ""), ("abc", "abc"), ("abcabc", "abc"), ("abc", "xabcx"),
+                         ("line\n", "line\nline\n"), ("äöü", "äxü")]:
+            self.assertRoundTrip(old, new)
+
+
+class RevisionsTestCase(TestCase):
+
+    def setUp(self):
+        self.client = PadServer.objects.create(title='local', url='http://localhost/', apikey='x').client
+
+    @mock.patch.object(config, 'DJANGOPAD_SNAPSHOT_INTERVAL', 3)
+    def testReplay(self):
+        padid = self.client.create_group_pad('g', 'notes', 'v0')
+        for i in range(1, 8):
+            self.assertTrue(self.client.set_text(padid, 'v{0} text'.format(i)))
+            self.assertEqual(self.client.get_text(padid), 'v{0} text'.format(i))
+        self.assertFalse(self.client.set_text(padid, 'v7 text'))
+        pad = StoredPad.objects.get(padid=padid)
+        self.assertEqual(pad.head, 7)
+        self.assertEqual(
+            list(pad.revisions.filter(snapshot__isnull=False).values_list('rev', flat=True).order_by('rev')),
+            [0, 3, 6],
+        )
+        self.assertEqual(self.client.get_texts([padid]), {padid: 'v7 text'})
+
+
+class GetTextsTestCase(TestCase):
+
+    def setUp(self):
+        self.client = PadServer.objects.create(title='local', url='http://localhost/', apikey='x').client
+
+    def testManyPads(self):
+        # More pads than SQLite allows expressions in one query
+        StoredPad.objects.bulk_create(
+            StoredPad(padid='g$pad{0}'.format(i), groupid='g') for i in range(1001)
+        )
+        pads = StoredPad.objects.order_by('pk')
+        PadRevision.objects.bulk_create(
+            PadRevision(pad=pad, rev=0, snapshot='text {0}'.format(pad.padid)) for pad in pads
+        )
+        padids = [pad.padid for pad in pads] + ['g$missing']
+        texts = self.client.get_texts(padids)
+        self.assertEqual(len(texts), 1002)
+        self.assertIsNone(texts['g$missing'])
+        self.assertEqual(texts['g$pad1000'], 'text g$pad1000')
+
+    def testMatchesGetText(self):
+        padid = self.client.create_group_pad('g', 'notes', 'first')
+        self.client.set_text(padid, 'first and second')
+        self.assertEqual(self.client.get_texts([padid]), {padid: self.client.get_text(padid)})
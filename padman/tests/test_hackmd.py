@@ -0,0 +1,101 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from padman.backend import aio
+from padman.backend.aio import AsyncHackMDBackend, httpx
+from padman.backend.hackmd import HackMDBackend
+
+
+class FakeResponse(object):
+
+    def __init__(self, url, status_code=200, text=''):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.history = []
+
+
+class FakeSession(object):
+    """A requests session against a HackMD server whose logins can expire
+    """
+    instances = []
+
+    def __init__(self):
+        self.logged_in = False
+        self.expired = False
+        FakeSession.instances.append(self)
+
+    def post(self, url, **kwargs):
+        if url.endswith('/auth/ldap'):
+            self.logged_in = True
+        return FakeResponse(url)
+
+    def get(self, url, **kwargs):
+        if url.endswith('/download'):
+            if not self.logged_in or self.expired:
+                return FakeResponse(url, 403)
+            return FakeResponse(url, text='# note')
+        return FakeResponse(url)
+
+
+class HackMDSessionTestCase(SimpleTestCase):
+
+    def setUp(self):
+        FakeSession.instances = []
+        patcher = mock.patch('padman.backend.hackmd.requests.session', FakeSession)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = HackMDBackend('ldap:user:secret', 'http://md.local/')
+
+    def testRelogin(self):
+        FakeSession.instances[0].expired = True
+        self.assertEqual(self.client.get_text('abc'), '# note')
+        self.assertEqual(len(FakeSession.instances), 2)
+        self.assertTrue(FakeSession.instances[1].logged_in)
+
+    def testSessionPerThread(self):
+        sessions = []
+        thread = threading.Thread(target=lambda: sessions.append(self.client._session()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(sessions[0], self.client._session())
+        self.assertEqual(len(FakeSession.instances), 2)
+
+
+@unittest.skipIf(httpx is None, "The asyncio backends require httpx")
+class AsyncHackMDSessionTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.logins = 0
+        self.expired = False
+
+    def handle(self, request):
+        path = request.url.path
+        if path == '/auth/ldap':
+            self.logins += 1
+            self.expired = False
+            return httpx.Response(302, headers={'Location': 'http://md.local/'})
+        if path == '/abc/download':
+            if self.expired:
+                return httpx.Response(302, headers={'Location': 'http://md.local/'})
+            return httpx.Response(200, text='# note')
+        return httpx.Response(200, text='start page')
+
+    def get_text(self):
+        async def run():
+            client = AsyncHackMDBackend('ldap:user:secret', 'http://md.local/')
+            client.server = aio._Server(transport=httpx.MockTransport(self.handle))
+            first = await client.get_text('abc')
+            self.expired = True
+            second = await client.get_text('abc')
+            await client.server.http.aclose()
+            return first, second
+        return asyncio.run(run())
+
+    def testRelogin(self):
+        self.assertEqual(self.get_text(), ('# note', '# note'))
+        self.assertEqual(self.logins, 2)
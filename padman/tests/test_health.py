@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from padman.backend import base
+from padman.backend.djangopad import DjangoPadBackend
+from padman.models import PadServer
+
+
+class HealthTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+
+    def testBusyIsNotOffline(self):
+        busy = mock.Mock(side_effect=base.ServerBusy("busy"))
+        with mock.patch.object(DjangoPadBackend, 'is_online', busy):
+            self.assertTrue(self.server.is_online())
+            self.assertTrue(self.server.is_online())
+        # Busy answers are not remembered
+        self.assertEqual(busy.call_count, 2)
+
+    def testOffline(self):
+        down = mock.Mock(side_effect=base.PadError("down"))
+        with mock.patch.object(DjangoPadBackend, 'is_online', down):
+            self.assertFalse(self.server.is_online())
+            self.assertFalse(self.server.is_online())
+        self.assertEqual(down.call_count, 1)
@@ -0,0 +1,62 @@
+import datetime
+
+from django.test import TestCase
+
+from padman.models import Pad, PadCategory, PadGroup, PadServer
+from padman.pagination import KeysetPaginator
+
+
+class KeysetPaginatorTestCase(TestCase):
+
+    def setUp(self):
+        server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        group = PadGroup.objects.create(server=server, parent=category, group_mapper='notes', name='notes')
+        day = datetime.datetime(2020, 1, 1)
+        # Duplicate names and dates, and pads that were never edited
+        for name, last_edited in [('b', day), ('a', None), ('b', None), ('c', day),
+                                  ('a', day + datetime.timedelta(days=1)), ('d', None)]:
+            pad = Pad(name=name, server=server, group=group)
+            pad.save()
+            Pad.objects.filter(pk=pad.pk).update(last_edited=last_edited)
+        self.pads = Pad.objects.all()
+
+    def walk(self, paginator):
+        pages = []
+        cursor = None
+        while True:
+            page = paginator.page(cursor)
+            pages.append([pad.pk for pad in page])
+            if not page.has_next():
+                return pages
+            cursor = page.next_cursor
+
+    def expected(self, field, descending):
+        pads = sorted(self.pads, key=lambda pad: pad.pk, reverse=descending)
+        if field == 'pk':
+            return [pad.pk for pad in pads]
+        # Nulls go last in both directions
+        present = sorted((pad for pad in pads if getattr(pad, field) is not None),
+                         key=lambda pad: getattr(pad, field), reverse=descending)
+        missing = [pad for pad in pads if getattr(pad, field) is None]
+        return [pad.pk for pad in present + missing]
+
+    def testOrderings(self):
+        for field, descending in [('pk', False), ('pk', True), ('name', False),
+                                  ('last_edited', False), ('last_edited', True)]:
+            for per_page in (1, 2, 4, 6, 10):
+                pages = self.walk(KeysetPaginator(self.pads, field, descending, per_page=per_page))
+                self.assertEqual(sum(pages, []), self.expected(field, descending), (field, descending, per_page))
+                self.assertTrue(all(0 < len(page) <= per_page for page in pages))
+
+    def testInvalidCursor(self):
+        paginator = KeysetPaginator(self.pads, 'name', per_page=2)
+        for cursor in ('garbage', 'WzEsMl0', 'bnVsbA=='):
+            self.assertEqual([pad.pk for pad in paginator.page(cursor)], self.expected('name', False)[:2])
+
+    def testCursorOfOtherOrdering(self):
+        by_name = KeysetPaginator(self.pads, 'name', per_page=2)
+        cursor = by_name.page().next_cursor
+        for field in ('user_count', 'last_edited'):
+            paginator = KeysetPaginator(self.pads, field, True, per_page=2)
+            self.assertEqual(len(paginator.page(cursor)), 2)
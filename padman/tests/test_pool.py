@@ -0,0 +1,56 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import TransactionTestCase
+
+from padman import config, pool
+from padman.models import Pad, PadCategory, PadGroup, PadServer, PoolPad, StoredPad
+
+
+class PoolTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        group = PadGroup.objects.create(server=self.server, parent=category, group_mapper='notes', name='notes')
+        self.template = Pad(
+            name='template', server=self.server, group=group, is_template=True,
+            template_padname='Notes {{ date }}', template_pool_size=2,
+        )
+        self.template.save()
+        # SQLite's shared in-memory test database locks up concurrent writers
+        with mock.patch.object(config, 'SERVER_CONCURRENCY', 1):
+            created, errors = pool.fill_pool(self.template)
+        self.assertEqual((created, errors), (2, []))
+
+    def testClaimRenames(self):
+        pad = pool.claim(self.template, 'Notes later', 'later', '')
+        self.assertEqual(pad.name, 'Notes later')
+        self.assertEqual(pad.slug, 'later')
+        self.assertTrue(StoredPad.objects.filter(padid=pad.padid).exists())
+        self.assertEqual(PoolPad.objects.filter(template=self.template).count(), 1)
+
+    def testFailedClaimKeepsEntry(self):
+        taken = Pad(name='taken', slug='taken', server=self.server, group=self.template.group)
+        taken.save()
+        with self.assertRaises(IntegrityError):
+            pool.claim(self.template, 'Notes later', 'taken', '')
+        self.assertEqual(PoolPad.objects.filter(template=self.template).count(), 2)
+
+    def testReconcileSkipsPool(self):
+        out = StringIO()
+        call_command('reconcile_pads', '--delete-orphans', '--workers', '1', stdout=out, stderr=out)
+        self.assertIn("0 orphaned", out.getvalue())
+        for entry in PoolPad.objects.all():
+            self.assertTrue(StoredPad.objects.filter(padid=entry.padid).exists())
+
+    def testTemplateUsingNameIsNotPooled(self):
+        self.server.client.set_text(self.template.padid, "# {{ name }}\n")
+        with mock.patch.object(config, 'SERVER_CONCURRENCY', 1):
+            created, errors = pool.fill_pool(self.template)
+        self.assertEqual(created, 0)
+        self.assertEqual(len(errors), 1)
+        self.assertFalse(PoolPad.objects.filter(template=self.template).exists())
+        self.assertIsNone(pool.claim(self.template, 'Notes later', 'later', ''))
@@ -0,0 +1,50 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from padman.backend import base
+from padman.backend.djangopad import DjangoPadBackend
+from padman.models import Pad, PadCategory, PadGroup, PadServer, StoredPad
+
+
+class PruneTestCase(TransactionTestCase):
+    """reconcile_pads --prune must only drop rows of pads that are gone
+    """
+
+    def setUp(self):
+        self.server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        self.group = PadGroup.objects.create(server=self.server, parent=category, group_mapper='notes', name='notes')
+        self.kept = Pad(name='kept', server=self.server, group=self.group)
+        self.kept.save()
+        self.gone = Pad(name='gone', server=self.server, group=self.group)
+        self.gone.save()
+        StoredPad.objects.filter(padid=self.gone.padid).delete()
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command('reconcile_pads', '--prune', '--workers', '1', *args, stdout=out, stderr=out)
+        return out.getvalue()
+
+    def testPrune(self):
+        with mock.patch.object(DjangoPadBackend, 'delete_pad') as delete_pad:
+            output = self.reconcile()
+        self.assertIn("pruned 1 pads", output)
+        self.assertFalse(Pad.objects.filter(pk=self.gone.pk).exists())
+        self.assertTrue(Pad.objects.filter(pk=self.kept.pk).exists())
+        delete_pad.assert_not_called()
+
+    def testTransientErrors(self):
+        with mock.patch.object(DjangoPadBackend, 'get_revision', side_effect=base.ServerBusy("busy")):
+            output = self.reconcile()
+        self.assertIn("pruned 0 pads", output)
+        self.assertTrue(Pad.objects.filter(pk=self.gone.pk).exists())
+
+    def testUnlistable(self):
+        client = mock.PropertyMock(return_value=base.PadBackend())
+        with mock.patch.object(PadServer, 'client', new_callable=lambda: client):
+            output = self.reconcile()
+        self.assertIn("can not be listed", output)
+        self.assertTrue(Pad.objects.filter(pk=self.gone.pk).exists())
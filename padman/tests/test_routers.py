@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory, TransactionTestCase
+
+from padman import config
+from padman.models import PadCategory
+from padman.routers import STICKY_COOKIE, PadmanRouter, PrimaryStickinessMiddleware
+
+
+@mock.patch.object(config, 'READ_REPLICA', 'replica')
+class RouterTestCase(TransactionTestCase):
+    """Reads go to the replica until the request writes a padman table
+    """
+
+    def setUp(self):
+        self.router = PadmanRouter()
+        self.category = PadCategory.objects.create(name='notes', slug='notes')
+        self.routes = []
+
+    def request(self, view, **cookies):
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies)
+
+        def get_response(request):
+            view()
+            return HttpResponse()
+        return PrimaryStickinessMiddleware(get_response)(request)
+
+    def route(self):
+        self.routes.append(self.router.db_for_read(PadCategory))
+
+    def testOutsideRequests(self):
+        self.route()
+        self.assertEqual(self.routes, ['default'])
+
+    def testReads(self):
+        def view():
+            self.route()
+            # Runs a SELECT on the write database
+            PadCategory.objects.get_or_create(slug='notes', defaults={'name': 'notes'})
+            self.route()
+        response = self.request(view)
+        self.assertEqual(self.routes, ['replica', 'replica'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def testWrites(self):
+        def view():
+            self.route()
+            PadCategory.objects.filter(pk=self.category.pk).update(pad_count=F('pad_count') + 1)
+            self.route()
+        response = self.request(view)
+        self.assertEqual(self.routes, ['replica', 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+    def testSticky(self):
+        response = self.request(self.route, **{STICKY_COOKIE: '1'})
+        self.assertEqual(self.routes, ['default'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
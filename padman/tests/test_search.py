@@ -0,0 +1,38 @@
+from django.test import TestCase
+
+from padman.models import NORMALIZED_NAME_LENGTH, Pad, PadCategory, PadGroup, PadServer, normalize_name
+
+
+class NormalizeNameTestCase(TestCase):
+
+    def testFolding(self):
+        self.assertEqual(normalize_name("Über  Straße\tÀ"), "uber strasse a")
+        self.assertEqual(normalize_name("  ﬁle  "), "file")
+        self.assertEqual(normalize_name(""), "")
+
+    def testLength(self):
+        # Every ligature decomposes into three letters
+        self.assertEqual(normalize_name("ﬃ" * 256), "ffi" * 85 + "f")
+        self.assertEqual(len(normalize_name("ﬃ" * 256)), NORMALIZED_NAME_LENGTH)
+
+
+class SearchNameTestCase(TestCase):
+
+    def setUp(self):
+        server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        group = PadGroup.objects.create(server=server, parent=category, group_mapper='notes', name='notes')
+        for name in ("Meeting notes", "Méeting agenda", "Minutes", "ﬃ" * 256):
+            Pad(name=name, server=server, group=group).save()
+
+    def search(self, query):
+        return [pad.name for pad in Pad.objects.search_name(query)]
+
+    def testPrefix(self):
+        # Shorter names match more closely
+        self.assertEqual(self.search("MEETING"), ["Meeting notes", "Méeting agenda"])
+        self.assertEqual(self.search("meeting n"), ["Meeting notes"])
+        self.assertEqual(self.search("agenda"), [])
+
+    def testLongNames(self):
+        self.assertEqual(self.search("ﬃ" * 300), ["ﬃ" * 256])
@@ -0,0 +1,105 @@
+import time
+
+from django.contrib.auth.models import Group, User
+from django.contrib.sessions.backends.signed_cookies import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from padman import config, sessions
+from padman.models import PadAuthor, PadCategory, PadGroup, PadServer
+
+
+class SessionsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.server = PadServer.objects.create(title='local', url='http://pads.local/', apikey='x')
+        self.other = PadServer.objects.create(title='other', url='http://other.local/', apikey='x')
+        user = User.objects.create_user('alice')
+        members = Group.objects.create(name='members')
+        user.groups.add(members)
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        category.groups.add(members)
+        self.group = PadGroup.objects.create(server=self.server, parent=category, group_mapper='notes', name='notes')
+        self.author = PadAuthor.objects.current(self.server, user)
+        self.request = self.make_request({})
+
+    def make_request(self, data):
+        request = RequestFactory().get('/')
+        request.session = SessionStore()
+        request.session.update(data)
+        request.session.modified = False
+        return request
+
+    def state(self, expires, sessions):
+        return {'expires': expires, 'domain': 'pads.local', 'sessions': sessions}
+
+
+class SaveStateTestCase(SessionsTestCase):
+
+    def testWritesChangesOnly(self):
+        state = self.state(time.time() + 60, {'g.notes': 's.1'})
+        sessions.save_state(self.request, self.server, state)
+        self.assertTrue(self.request.session.modified)
+        self.assertEqual(sessions.get_state(self.request, self.server), state)
+
+        request = self.make_request(dict(self.request.session))
+        sessions.save_state(request, self.server, dict(state))
+        self.assertFalse(request.session.modified)
+
+    def testDropsExpiredServers(self):
+        now = time.time()
+        sessions.save_state(self.request, self.other, self.state(now - 1, {'g.old': 's.old'}))
+        sessions.save_state(self.request, self.server, self.state(now + 60, {}))
+        self.assertEqual(list(self.request.session['etherpad']), [str(self.server.pk)])
+
+    def testOldFormat(self):
+        request = self.make_request({'etherpad': {'expires': 1, 'sessions': {}}})
+        self.assertEqual(sessions.get_state(request, self.server)['sessions'], {})
+
+
+class PlanSessionsTestCase(SessionsTestCase):
+
+    def testNoSessions(self):
+        state, missing, stale = sessions.plan_sessions(self.request, self.author)
+        self.assertEqual(missing, [self.group.groupID])
+        self.assertEqual(stale, {})
+        self.assertEqual(state['domain'], 'pads.local')
+        self.assertGreater(state['expires'], time.time() + config.SESSION_RENEWAL_WINDOW)
+
+    def testKeepsValidSessions(self):
+        expires = time.time() + config.SESSION_LENGTH
+        sessions.save_state(self.request, self.server, self.state(expires, {
+            self.group.groupID: 's.1',
+            'g.left': 's.2',
+        }))
+        state, missing, stale = sessions.plan_sessions(self.request, self.author)
+        self.assertEqual(state, self.state(expires, {self.group.groupID: 's.1'}))
+        self.assertEqual(missing, [])
+        # Sessions of groups the user left are deleted
+        self.assertEqual(stale, {'g.left': 's.2'})
+
+    def testExpiredSessions(self):
+        sessions.save_state(self.request, self.server, self.state(time.time() - 1, {self.group.groupID: 's.1'}))
+        state, missing, stale = sessions.plan_sessions(self.request, self.author)
+        self.assertEqual(state['sessions'], {})
+        self.assertEqual(missing, [self.group.groupID])
+
+    def testRenewedSessions(self):
+        now = time.time()
+        sessions.save_state(self.request, self.server, self.state(now + 60, {self.group.groupID: 's.old'}))
+        renewed = now + config.SESSION_LENGTH
+        cache.set(sessions.RENEWAL_KEY.format(self.author.pk), {
+            'expires': renewed,
+            'sessions': {self.group.groupID: 's.new'},
+        })
+        state, missing, stale = sessions.plan_sessions(self.request, self.author)
+        self.assertEqual(state, self.state(renewed, {self.group.groupID: 's.new'}))
+        self.assertEqual((missing, stale), ([], {}))
+
+    def testSharedSessions(self):
+        shared = time.time() + config.SESSION_LENGTH / 2
+        sessions.share_sessions(self.author, {self.group.groupID: 's.shared'}, shared)
+        state, missing, stale = sessions.plan_sessions(self.request, self.author)
+        self.assertEqual(state, self.state(shared, {self.group.groupID: 's.shared'}))
+        self.assertEqual(missing, [])
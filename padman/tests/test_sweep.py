@@ -0,0 +1,64 @@
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TransactionTestCase
+
+from padman.backend import base
+from padman.backend.djangopad import DjangoPadBackend
+from padman.models import PadAuthor, PadCategory, PadGroup, PadServer
+
+
+class SweepTestCase(TransactionTestCase):
+
+    def setUp(self):
+        self.server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        self.group = PadGroup.objects.create(server=self.server, parent=category, group_mapper='notes', name='notes')
+        self.author = PadAuthor.objects.current(self.server, User.objects.create_user('alice'))
+        now = time.time()
+        self.sessions = {
+            self.group.groupID: {
+                's.expired': {'validUntil': now - 60},
+                's.valid': {'validUntil': now + 60},
+            },
+            self.author.authorID: {
+                's.expired': {'validUntil': now - 60},
+                's.left': {'validUntil': now - 1},
+            },
+        }
+        self.deleted = []
+
+    def sweep(self, *args, **client):
+        client.setdefault('list_group_sessions', lambda owner: self.sessions[owner])
+        client.setdefault('list_author_sessions', lambda owner: self.sessions[owner])
+        client.setdefault('delete_session', self.deleted.append)
+        client = dict((name, staticmethod(method)) for name, method in client.items())
+        out = StringIO()
+        with mock.patch.multiple(DjangoPadBackend, **client):
+            call_command('sweep_pad_sessions', '--workers', '1', '--rate', '0', *args, stdout=out, stderr=out)
+        return out.getvalue()
+
+    def testSweep(self):
+        output = self.sweep()
+        self.assertEqual(sorted(self.deleted), ['s.expired', 's.left'])
+        self.assertIn("2 expired sessions deleted, 0 failed", output)
+
+    def testDryRun(self):
+        output = self.sweep('--dry-run')
+        self.assertEqual(self.deleted, [])
+        self.assertIn("2 expired sessions", output)
+
+    def testListingErrors(self):
+        def busy(owner):
+            raise base.ServerBusy("busy")
+        output = self.sweep(list_group_sessions=busy)
+        self.assertEqual(sorted(self.deleted), ['s.expired', 's.left'])
+        self.assertIn("could not list sessions of {0}".format(self.group.groupID), output)
+
+    def testNoSessions(self):
+        output = self.sweep(list_group_sessions=lambda owner: None, list_author_sessions=lambda owner: None)
+        self.assertEqual(self.deleted, [])
+        self.assertNotIn("deleted", output)
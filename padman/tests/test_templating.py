@@ -0,0 +1,56 @@
+import datetime
+from unittest import mock
+
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from padman import config, templating
+from padman.templating import SimpleTemplate
+
+
+class SimpleTemplateTestCase(SimpleTestCase):
+
+    context = {
+        'name': 'Notes <b>',
+        'date': datetime.date(2020, 1, 2),
+        'count': lambda: 3,
+    }
+
+    def assertSameAsEngine(self, source):
+        template = SimpleTemplate.parse(source)
+        self.assertIsNotNone(template, source)
+        self.assertEqual(
+            template.render(Context(self.context)),
+            Template(source).render(Context(self.context)),
+        )
+
+    def testSubstitutions(self):
+        for source in ["", "plain text", "{{ name }}", "{{name}} on {{ date }}", "{{ count }}",
+                       "{{ missing }}", "{{ True }} {{ None }}", "{ not a tag }"]:
+            self.assertSameAsEngine(source)
+
+    @override_settings(TEMPLATES=[{
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'OPTIONS': {'string_if_invalid': 'INVALID(%s)'},
+    }])
+    def testInvalid(self):
+        self.assertSameAsEngine("{{ missing }}")
+        self.assertEqual(SimpleTemplate.parse("{{ missing }}").render(Context()), "INVALID(missing)")
+
+    def testNeedsEngine(self):
+        for source in ["{{ 1 }}", "{{ date|date:'Y' }}", "{{ date.year }}", "{% if name %}x{% endif %}",
+                       "{# comment #}", "{{ _private }}"]:
+            self.assertIsNone(SimpleTemplate.parse(source), source)
+
+    def testCompile(self):
+        self.assertIsInstance(templating.compile_template("{{ name }}"), SimpleTemplate)
+        self.assertEqual(templating.compile_template("{{ 1 }}").render(Context()), "1")
+        with mock.patch.object(config, 'TEMPLATE_FAST_PATH', False):
+            self.assertIsInstance(templating.compile_template("{{ name }}"), Template)
+
+    def testReferences(self):
+        names = ('name', 'slug')
+        for source, expected in [("{{ date }} {{ names }}", False), ("# {{ name }}", True),
+                                 ("{{ date|date:'Y' }}", False), ("{% if slug %}x{% endif %}", True),
+                                 ("{{ name.upper }}", True), ("name and slug", False)]:
+            self.assertEqual(templating.references(templating.compile_template(source), names), expected, source)
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from padman import transfer
+from padman.backend.base import PadError
+from padman.models import Pad, PadCategory, PadGroup, PadServer, StoredPad
+
+
+class MovePadTestCase(TestCase):
+
+    def setUp(self):
+        server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        self.client = server.client
+        category = PadCategory.objects.create(name='notes', slug='notes')
+        self.source = PadGroup.objects.create(server=server, parent=category, group_mapper='old', name='old')
+        self.target = PadGroup.objects.create(server=server, parent=category, group_mapper='new', name='new')
+        self.pad = Pad(name='minutes', server=server, group=self.source)
+        self.pad.save()
+        self.source_padid = self.pad.padid
+        self.client.set_text(self.source_padid, 'before')
+
+    def editing(self, times):
+        """Lets someone edit the source right after each of the first
+        `times` copies
+        """
+        write = transfer._write
+        edits = []
+
+        def edit_after(client, padid, text, html):
+            write(client, padid, text, html)
+            if len(edits) < times:
+                edits.append(text)
+                self.client.set_text(self.source_padid, 'edit {0}'.format(len(edits)))
+        return mock.patch.object(transfer, '_write', edit_after)
+
+    def testMove(self):
+        pad = transfer.move_pad(self.pad, self.target)
+        self.assertEqual(Pad.objects.get(pk=pad.pk).group, self.target)
+        self.assertEqual(self.client.get_text(pad.padid), 'before')
+        self.assertFalse(StoredPad.objects.filter(padid=self.source_padid).exists())
+
+    def testEditDuringMove(self):
+        with self.editing(2):
+            pad = transfer.move_pad(self.pad, self.target)
+        self.assertEqual(self.client.get_text(pad.padid), 'edit 2')
+        self.assertFalse(StoredPad.objects.filter(padid=self.source_padid).exists())
+
+    def testKeepsChangingSource(self):
+        with self.editing(transfer.SYNC_ATTEMPTS + 1):
+            with self.assertRaises(PadError):
+                transfer.move_pad(self.pad, self.target)
+        # The move did not happen, so it can be repeated
+        self.assertEqual(Pad.objects.get(pk=self.pad.pk).group, self.source)
+        self.assertEqual(self.client.get_text(self.source_padid), 'edit {0}'.format(transfer.SYNC_ATTEMPTS + 1))
+        self.assertEqual(list(StoredPad.objects.values_list('padid', flat=True)), [self.source_padid])
+
+        pad = transfer.move_pad(Pad.objects.get(pk=self.pad.pk), self.target)
+        self.assertEqual(self.client.get_text(pad.padid), 'edit {0}'.format(transfer.SYNC_ATTEMPTS + 1))
+        self.assertFalse(StoredPad.objects.filter(padid=self.source_padid).exists())
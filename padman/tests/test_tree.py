@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from padman import tree
+from padman.models import PadCategory
+
+
+class InvalidationTestCase(TransactionTestCase):
+    """The cached tree must not be dropped before changes are committed
+    """
+
+    def setUp(self):
+        cache.clear()
+        PadCategory.objects.create(name='a', slug='a')
+
+    def testStructure(self):
+        self.assertEqual([node.slug for node in tree.get_forest()], ['a'])
+        version = cache.get(tree.STRUCTURE_VERSION)
+        with transaction.atomic():
+            PadCategory.objects.create(name='b', slug='b')
+            self.assertEqual(cache.get(tree.STRUCTURE_VERSION), version)
+        self.assertEqual(cache.get(tree.STRUCTURE_VERSION), version + 1)
+        self.assertEqual([node.slug for node in tree.get_forest()], ['a', 'b'])
+
+    def testRollback(self):
+        version = tree._version(tree.STRUCTURE_VERSION)
+        try:
+            with transaction.atomic():
+                PadCategory.objects.create(name='b', slug='b')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(cache.get(tree.STRUCTURE_VERSION), version)
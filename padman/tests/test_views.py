@@ -0,0 +1,102 @@
+import io
+import zipfile
+from unittest import mock
+
+from django.contrib.auth.models import Group, User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from padman import config
+from padman.models import Pad, PadCategory, PadGroup, PadServer
+
+
+@override_settings(ROOT_URLCONF='padman.tests.urls')
+class ViewsTestCase(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('alice')
+        self.members = Group.objects.create(name='members')
+        self.category = PadCategory.objects.create(name='notes', slug='notes')
+        self.category.groups.add(self.members)
+        server = PadServer.objects.create(title='local', url='http://localhost/', apikey='x')
+        self.group = PadGroup.objects.create(server=server, parent=self.category, group_mapper='notes', name='notes')
+        self.pad = Pad(name='secret', server=server, group=self.group)
+        self.pad.save()
+        server.client.set_text(self.pad.padid, 'secret text')
+
+    def join(self):
+        self.user.groups.add(self.members)
+
+
+class PadTextViewTestCase(ViewsTestCase):
+
+    def url(self):
+        return reverse('padman:padtext', args=[self.pad.padid])
+
+    def testAnonymous(self):
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 302)
+
+    def testNonMember(self):
+        self.client.force_login(self.user)
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(self.url(), {'text': 'overwritten'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.pad.server.client.get_text(self.pad.padid), 'secret text')
+
+    def testMember(self):
+        self.join()
+        self.client.force_login(self.user)
+        response = self.client.get(self.url())
+        self.assertContains(response, 'secret text')
+        response = self.client.post(self.url(), {'text': 'new text'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.pad.server.client.get_text(self.pad.padid), 'new text')
+
+
+class CategoryExportViewTestCase(ViewsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        child = PadCategory.objects.create(name='private', slug='private', parent=self.category)
+        child.groups.add(Group.objects.create(name='others'))
+        group = PadGroup.objects.create(server=self.pad.server, parent=child, group_mapper='private', name='private')
+        private = Pad(name='private', server=self.pad.server, group=group)
+        private.save()
+        self.pad.server.client.set_text(private.padid, 'private text')
+
+    def export(self):
+        response = self.client.get(reverse('padman:category-export', args=['notes']))
+        if response.status_code != 200:
+            return response.status_code
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        return sorted(archive.namelist())
+
+    def testNonMember(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.export(), 403)
+
+    def testMember(self):
+        self.join()
+        self.client.force_login(self.user)
+        self.assertEqual(self.export(), ['notes/secret.txt'])
+
+    def testStaff(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        self.assertEqual(self.export(), ['notes/private/private.txt', 'notes/secret.txt'])
+
+
+class CategoryViewTestCase(ViewsTestCase):
+
+    def testCursorOfOtherSort(self):
+        Pad(name='another', server=self.pad.server, group=self.group).save()
+        self.join()
+        self.client.force_login(self.user)
+        url = reverse('padman:category-slug', args=['notes'])
+        with mock.patch.object(config, 'PADS_PER_PAGE', 1):
+            cursor = self.client.get(url, {'sort': 'name'}).context['pads'].next_cursor
+            response = self.client.get(url, {'sort': 'users', 'after': cursor})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,111 @@
+"""
+Moving pads to another group, possibly on another pad server.
+
+The content of a pad is copied to the target first, as HTML where both
+backends support it, and the pad stays usable on the source meanwhile.
+Its row is switched over in the same transaction that deletes the source,
+and the source is only deleted if it is still at the revision copied last.
+Otherwise the switch is rolled back and the edits copied again. A source
+that keeps changing is left in place, with its row untouched, and the move
+reported as failed. Writing the copy is idempotent, so an interrupted or
+failed move can simply be repeated: a pad counts as moved once its row
+points to the target group.
+"""
+from django.db import transaction
+
+from . import config, models
+from .backend.base import PadError, fresh
+from .concurrency import map_bounded
+from .counts import adjust_pad_counts
+
+# How often edits made during a move are copied before giving up
+SYNC_ATTEMPTS = 3
+
+
+class _SourceChanged(Exception):
+    pass
+
+
+def _fetch(client, padid):
+    # The text must be at least as new as the revision read before it
+    return fresh(client.get_text)(padid), client.get_html(padid)
+
+def _write(client, padid, text, html):
+    if html is None or not client.set_html(padid, html):
+        client.set_text(padid, text)
+
+
+def _discard(target, server, padid):
+    """Deletes the copy of a pad that was not moved, unless a row uses it
+    """
+    if not models.Pad.objects.filter(server=server, padid=padid).exists():
+        target.delete_pad(padid)
+
+
+def move_pad(pad, group):
+    """Moves a pad into `group`, on the server of that group
+    """
+    if pad.group_id == group.pk:
+        return pad
+    source = pad.server.client
+    target = group.server.client
+
+    expected = target.group_pad_id(group.groupID, target.sanitize_pad_name(pad.name))
+    if models.Pad.objects.filter(server=group.server, padid=expected).exclude(pk=pad.pk).exists():
+        raise PadError("A pad with this name already exists in the target group", pad.name)
+
+    if pad.is_template:
+        # Pooled pads were created in the old group
+        from .pool import drain_pool
+        drain_pool(pad)
+
+    revision = source.get_revision(pad.padid)
+    text, html = _fetch(source, pad.padid)
+    padid = target.create_group_pad(group.groupID, pad.name, text=text)
+    # The pad may be left over from an interrupted move, so always write it
+    _write(target, padid, text, html)
+    if pad.password:
+        target.set_password(padid, pad.password)
+    target.set_public_status(padid, pad.is_public)
+
+    for attempt in range(SYNC_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Only switch the row over if nobody else changed it meanwhile
+                switched = models.Pad.objects.filter(
+                    pk=pad.pk,
+                    server=pad.server_id,
+                    group=pad.group_id,
+                    padid=pad.padid,
+                ).update(server=group.server, group=group, padid=padid)
+                if switched:
+                    if not source.delete_unchanged_pad(pad.padid, revision):
+                        raise _SourceChanged()
+                    # update() does not send signals
+                    adjust_pad_counts(models.group_category(pad.group_id), -1)
+                    adjust_pad_counts(group.parent_id, 1)
+        except _SourceChanged:
+            # Edited since the last copy, the row stays on the source
+            revision = source.get_revision(pad.padid)
+            _write(target, padid, *_fetch(source, pad.padid))
+            continue
+        if not switched:
+            _discard(target, group.server, padid)
+            raise PadError("Pad was changed during the move", pad.padid)
+        break
+    else:
+        _discard(target, group.server, padid)
+        raise PadError("Pad kept changing during the move", pad.padid)
+
+    pad.server = group.server
+    pad.group = group
+    pad.padid = padid
+    pad._loaded_group_id = group.pk
+    return pad
+
+
+def move_pads(pads, group, workers=config.SERVER_CONCURRENCY):
+    """Moves many pads into `group` concurrently and yields `(pad, moved,
+    error)` triples as they finish
+    """
+    return map_bounded(lambda pad: move_pad(pad, group), pads, workers)
@@ -0,0 +1,166 @@
+"""
+Cached access to the PadCategory hierarchy.
+
+The whole forest is loaded with a single query and kept in the cache under
+a structure version, which is bumped whenever a category is inserted,
+changed, moved or deleted. The category groups, which decide what a user
+may see, and the pad counts are kept under separate versions, so changing
+them does not discard the structure. Rendered sidebars are cached per
+version, set of auth groups and current category.
+"""
+
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import config
+
+STRUCTURE_VERSION = 'padman:tree:structure'
+VISIBILITY_VERSION = 'padman:tree:visibility'
+COUNTS_VERSION = 'padman:tree:counts'
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+def _bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, None)
+
+# The versions are bumped once the current transaction commits. Bumping
+# earlier would let concurrent readers cache the uncommitted state under
+# the new version
+
+def invalidate_structure():
+    transaction.on_commit(lambda: _bump(STRUCTURE_VERSION))
+
+def invalidate_visibility():
+    transaction.on_commit(lambda: _bump(VISIBILITY_VERSION))
+
+def invalidate_counts():
+    transaction.on_commit(lambda: _bump(COUNTS_VERSION))
+
+
+def get_forest():
+    """Returns all categories in tree order
+    """
+    from .models import PadCategory
+
+    key = 'padman:tree:nodes:{0}'.format(_version(STRUCTURE_VERSION))
+    nodes = cache.get(key)
+    if nodes is None:
+        nodes = list(PadCategory.objects.order_by('tree_id', 'lft'))
+        cache.set(key, nodes, config.TREE_CACHE_TIMEOUT)
+    return nodes
+
+def get_category_groups():
+    """Returns the ids of the auth groups of every category
+    """
+    from .models import PadCategory
+
+    key = 'padman:tree:groups:{0}'.format(_version(VISIBILITY_VERSION))
+    groups = cache.get(key)
+    if groups is None:
+        groups = {}
+        through = PadCategory.groups.through.objects.values_list('padcategory_id', 'group_id')
+        for category_id, group_id in through:
+            groups.setdefault(category_id, set()).add(group_id)
+        cache.set(key, groups, config.TREE_CACHE_TIMEOUT)
+    return groups
+
+def get_pad_counts():
+    """Returns the direct and subtree pad counts of every category
+    """
+    from .models import PadCategory
+
+    key = 'padman:tree:counts:{0}'.format(_version(COUNTS_VERSION))
+    counts = cache.get(key)
+    if counts is None:
+        counts = dict(
+            (pk, (pad_count, subtree_pad_count)) for pk, pad_count, subtree_pad_count in
+            PadCategory.objects.values_list('pk', 'pad_count', 'subtree_pad_count')
+        )
+        cache.set(key, counts, config.TREE_CACHE_TIMEOUT)
+    return counts
+
+
+def get_root(category):
+    for node in get_forest():
+        if node.tree_id == category.tree_id and node.level == 0:
+            return node
+    return category.get_root()
+
+def get_by_slug(slug):
+    for node in get_forest():
+        if node.slug == slug:
+            return node
+    return None
+
+
+def _user_groups(user):
+    if not user.is_authenticated:
+        return frozenset()
+    return frozenset(user.groups.values_list('pk', flat=True))
+
+def visible_nodes(root, user):
+    """Returns the nodes of the tree below `root` that are visible to the
+    user: those shared with one of the user's groups and their ancestors
+    """
+    nodes = [node for node in get_forest() if node.tree_id == root.tree_id]
+    if user.is_superuser:
+        return nodes
+    user_groups = _user_groups(user)
+    category_groups = get_category_groups()
+    visible = set()
+    ancestors = []
+    for node in nodes:
+        while ancestors and ancestors[-1].rght < node.lft:
+            ancestors.pop()
+        ancestors.append(node)
+        if category_groups.get(node.pk, set()) & user_groups:
+            visible.update(n.pk for n in ancestors)
+    return [node for node in nodes if node.pk in visible]
+
+
+def render_tree(root, current, user):
+    """Renders the sidebar tree of `root`, highlighting `current`
+    """
+    user_groups = 'all' if user.is_superuser else ",".join(str(pk) for pk in sorted(_user_groups(user)))
+    key = 'padman:tree:html:{0}:{1}:{2}:{3}:{4}:{5}'.format(
+        _version(STRUCTURE_VERSION),
+        _version(VISIBILITY_VERSION),
+        _version(COUNTS_VERSION),
+        hashlib.md5(user_groups.encode('ascii')).hexdigest(),
+        root.pk,
+        current.pk if current else '',
+    )
+    html = cache.get(key)
+    if html is None:
+        # Nest the flat, tree ordered list of nodes
+        counts = get_pad_counts()
+        top = []
+        stack = []
+        for node in visible_nodes(root, user):
+            pad_count, subtree_pad_count = counts.get(node.pk, (0, 0))
+            entry = {
+                'category': node,
+                'children': [],
+                'pad_count': pad_count,
+                'subtree_pad_count': subtree_pad_count,
+            }
+            while stack and stack[-1]['category'].rght < node.lft:
+                stack.pop()
+            (stack[-1]['children'] if stack else top).append(entry)
+            stack.append(entry)
+        html = render_to_string('padman/category-tree.html', {'nodes': top, 'current': current})
+        cache.set(key, html, config.TREE_CACHE_TIMEOUT)
+    return mark_safe(html)
@@ -13,6 +13,8 @@ urlpatterns = [
         url(r'^raw/$', views.RawPadView.as_view(), name="rawpad"),
     ])),
 
+    url(r'^text/(?P<padid>[^/]+)/$', views.PadTextView.as_view(), name="padtext"),
+
     url(r'^search/$', views.padSearch, name="search"),
     url(r'^~create/$', views.groupCreate, name="groupcreate"),
 
@@ -21,6 +23,7 @@ urlpatterns = [
         url(r'^~newpad/$', views.PadCreateView.as_view(), name="create"),
         url(r'^~search/$', views.groupSearch, name='groupsearch'),
         url(r'^~edit/$', views.CategorySettingsView.as_view(), name='category-settings'),
+        url(r'^~export/$', views.CategoryExportView.as_view(), name='category-export'),
         url(r'^~import/$', views.GroupPadImportView.as_view(), name='grouppadimport'),
         url(r'^(?P<show>[\w ]+)/$', views.PadMapperView.as_view(), name='padmapper'),
     ])),
@@ -2,16 +2,19 @@
 
 # Python imports
 import datetime
-import time
+from collections import OrderedDict
 import urllib.request, urllib.parse, urllib.error
+import zipfile
 from urllib.parse import urlparse
 from urllib.error import HTTPError, URLError
 
 # Framework imports
-from django.shortcuts import render_to_response, render, get_object_or_404
-from django.http import HttpResponseRedirect
+from django.shortcuts import render, get_object_or_404
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponseRedirect, StreamingHttpResponse
 from django.template import RequestContext, Template, Context
-from django.views.generic import DetailView, UpdateView
+from django.views.generic import DetailView, UpdateView, View
+from django.views.generic.detail import SingleObjectMixin
 from django.views.generic.edit import FormView
 from django.views.decorators.csrf import csrf_protect
 from django.contrib.auth.decorators import login_required
@@ -24,67 +27,38 @@ from django.urls import reverse_lazy
 from py_etherpad import EtherpadLiteClient
 
 # local imports
-from . import models, forms, config
+from . import models, forms, config, tree, templating, pool, bulk, shortlinks
+from .pagination import KeysetPage, KeysetPaginator
+from .sessions import get_state, update_request, update_response
 
 LOGIN_URL = reverse_lazy('padman:login')
 
-def update_request(request, pad_server):
-    """Updates the session to reflect the users group membership
-    """
-
-    author = models.PadAuthor.objects.current(pad_server, request.user)
-    if author and pad_server.client.is_online():
-
-        server = urlparse(author.server.url)
-        groups = author.groups
+# Number of pads whose text is fetched with one batch call when exporting
+EXPORT_BATCH_SIZE = 200
 
-        now = datetime.datetime.utcnow()
-        expires = now + datetime.timedelta(seconds=config.SESSION_LENGTH)
+# Orderings of pad listings, selected with the `sort` query parameter
+PAD_ORDERINGS = {
+    'name': ('name', False),
+    'id': ('pk', False),
+    'last_edited': ('last_edited', True),
+    'users': ('user_count', True),
+}
 
-        sessions = request.session.get("etherpad",{
-            'expires': 0,
-            'domain': server.hostname,
-        })
-
-        old_expires = datetime.datetime.fromtimestamp(sessions.get('expires'))
-        new_expires = (expires if old_expires < now else old_expires)
-        new_sessions = {'expires': new_expires.timestamp(), 'domain': server.hostname }
-
-        # Provide valid sessions for all groups
-        for group in groups:
-            if group.groupID not in sessions or old_expires < now:
-                group_session_expires = time.mktime(new_expires.timetuple())
-                group_session_id = pad_server.client.create_session(group.groupID, author.authorID, group_session_expires)
-
-                if group_session_id:
-                    new_sessions[group.groupID] = {
-                        'sessionID': group_session_id,
-                    }
-                if group.groupID in sessions:
-                    sessions.pop(group.groupID)
-            elif group.groupID in sessions:
-                new_sessions[group.groupID] = sessions.pop(group.groupID)
-
-        # Invalidate remaining sessions
-        for group in sessions.keys():
-            if group not in ('expires', 'domain'):
-                pad_server.client.delete_session(sessions[group]['sessionID'])
-
-        # Update session
-        request.session['etherpad'] = new_sessions
-
-def update_response(request, response):
-    if request.user.is_authenticated:
-        sessions = request.session.get("etherpad",{})
-        #response.delete_cookie('sessionID', sessions.get('domain'))
-        response.set_cookie(
-            'sessionID',
-            value='%2C'.join(s['sessionID'] for g,s in sessions.items() if g not in ('expires', 'domain')),
-            expires=sessions.get('expires'),
-            domain=sessions.get('domain'),
-            httponly=False
-        )
-    return response
+def paginate_pads(request, pads):
+    """Applies the ordering, activity filter and page requested in the
+    query string
+    """
+    if request.GET.get('active'):
+        pads = pads.filter(user_count__gt=0)
+    sort = request.GET.get('sort')
+    if sort not in PAD_ORDERINGS:
+        sort = 'name'
+    field, descending = PAD_ORDERINGS[sort]
+    paginator = KeysetPaginator(pads, field, descending, per_page=config.PADS_PER_PAGE)
+    return {
+        'pads': paginator.page(request.GET.get('after')),
+        'sort': sort,
+    }
 
 # Lazily evaluate session only on etherpad viewss
 def session_wrapper(function):
@@ -119,15 +93,7 @@ class PadCreateView(LoginRequiredMixin, DetailView, FormView):
         server = form.cleaned_data['server']
         name = form.cleaned_data['name']
 
-        group, created = models.PadGroup.objects.get_or_create(
-            server=server,
-            parent=category,
-        )
-
-        if created:
-            group.group_mapper = category.slug
-            group.name = category.name
-            group.save()
+        group = bulk.get_or_create_group(category, server)
 
         pad = models.Pad(
             name=form.cleaned_data['name'],
@@ -297,7 +263,7 @@ class PadView(DetailView):
         response = super().render_to_response(context, **response_kwargs)
         for cookie in self.response_cookies:
             response.set_cookie(**cookie)
-        response = update_response(self.request, response)
+        response = update_response(self.request, response, self.object.server)
         return response
 
     def get_context_data(self, **kwargs):
@@ -333,14 +299,13 @@ class PadView(DetailView):
         })
 
         if author:
-            session = self.request.session.get("etherpad")
-            if not session:
+            state = get_state(self.request, pad.server)
+            if not state['expires']:
                 raise RuntimeError("PadServer not available")
-            expires = datetime.datetime.fromtimestamp(session.get('expires'))
+            expires = datetime.datetime.utcfromtimestamp(state['expires'])
 
-            group_session = session.get(pad.group.groupID)
-            if group_session:
-                sessionID = group_session.get('sessionID')
+            sessionID = state['sessions'].get(pad.group.groupID)
+            if sessionID:
                 self.response_cookies += [{
                     'key': 'padSessionID',
                     'value': sessionID,
@@ -350,17 +315,51 @@ class PadView(DetailView):
 
         return context
 
+class PadTextView(LoginRequiredMixin, FormView):
+    """Plain text editor for pads stored by the DjangoPad backend
+    """
+    template_name = 'padman/padText.html'
+    form_class = forms.PadTextForm
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        self.pad = get_object_or_404(models.Pad, padid=kwargs['padid'], server__backend=models.PadServer.DJANGOPAD)
+        # Reading the text is as restricted as editing it
+        if not self.pad.group.is_member(request.user):
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_success_url(self):
+        return self.request.path
+
+    def get_initial(self):
+        return {'text': self.pad.server.client.get_text(self.pad.padid)}
+
+    def form_valid(self, form):
+        self.pad.server.client.set_text(self.pad.padid, form.cleaned_data['text'])
+        return super().form_valid(form)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            'pad': self.pad,
+            'title': self.pad.name,
+            'submit': _('save'),
+        })
+        return context
+
 class PadSlugView(PadView):
 
     def get_object(self):
         kwargs = self.request.resolver_match.kwargs
-        return get_object_or_404(models.Pad, **kwargs)
+        return shortlinks.resolve_slug(kwargs['slug'])
 
 class PadMapperView(PadView):
 
     def get_object(self):
         kwargs = self.request.resolver_match.kwargs
-        return get_object_or_404(models.Pad, group__group_mapper=kwargs['group'], name=kwargs['show'])
+        return shortlinks.resolve_mapper(kwargs['category'], kwargs['show'])
 
 
 class BaseCategoryView(LoginRequiredMixin, DetailView):
@@ -371,8 +370,9 @@ class BaseCategoryView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({'current': self.current})
+        context.update({'category_tree': tree.render_tree(self.root, self.current, self.request.user)})
         context.update({'create_form': forms.PadCreate(initial={'category': self.current.slug})})
-        context.update({'pads': models.Pad.objects.filter(group__parent=self.current)})
+        context.update(paginate_pads(self.request, models.Pad.objects.filter(group__parent=self.current)))
         context.update({'templates': models.Pad.objects.templates(self.current)})
         context.update({'pad_settings_form': forms.SettingsForm()})
         return context
@@ -380,16 +380,21 @@ class BaseCategoryView(LoginRequiredMixin, DetailView):
 class IndexView(BaseCategoryView):
 
     def get_object(self):
-        self.root = models.PadCategory.objects.root_nodes().first()
-        self.current = self.root.get_descendants().first()
+        nodes = tree.get_forest()
+        self.root = nodes[0] if nodes else None
+        if self.root is None:
+            raise Http404(_('No categories'))
+        self.current = next((node for node in nodes[1:] if node.tree_id == self.root.tree_id), None)
         return self.root
 
 class CategoryView(BaseCategoryView):
 
     def get_object(self):
         kwargs = self.request.resolver_match.kwargs
-        self.current = get_object_or_404(models.PadCategory, slug=kwargs['category'])
-        self.root = self.current.get_root()
+        self.current = tree.get_by_slug(kwargs['category'])
+        if self.current is None:
+            self.current = get_object_or_404(models.PadCategory, slug=kwargs['category'])
+        self.root = tree.get_root(self.current)
         return self.root
 
 class PadGroupView(LoginRequiredMixin, DetailView):
@@ -406,11 +411,14 @@ class PadGroupView(LoginRequiredMixin, DetailView):
         group = self.object
 
         pads = group.pad_set.all()
-        if "query" in self.request.GET:
-            pads = pads.filter(name__contains=self.request.GET.get("query"))
-
+        query = self.request.GET.get("query")
+        if query:
+            # Search results are ranked, only show the best matches
+            pads = pads.search_name(query)[:config.PADS_PER_PAGE]
+            context.update({'pads': KeysetPage(list(pads), None), 'query': query})
+        else:
+            context.update(paginate_pads(self.request, pads))
         context.update({
-            'pads': pads,
             'create_form': forms.PadCreate({'group': group.groupID}),
             'categories': models.PadCategory.objects.all().filter(parent=None),
             'groups': models.PadGroup.objects.all().filter(parent=None),
@@ -425,6 +433,96 @@ class PadGroupMapperView(PadGroupView):
         group = get_object_or_404(models.PadGroup, group_mapper=kwargs['group'])
         return group
 
+class ZipStream(object):
+    """Write-only file object that collects the output of a ZipFile until
+    it is drained. Lacking seek(), it makes ZipFile write data descriptors
+    instead of patching headers after the fact.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class CategoryExportView(LoginRequiredMixin, SingleObjectMixin, View):
+    """Streams a ZIP archive with the text of every pad in a category and
+    all of its descendants that the user is a member of, or of all of them
+    for staff
+    """
+    model = models.PadCategory
+    slug_url_kwarg = 'category'
+
+    def get_filename(self, pad, used):
+        path = "/".join(c.slug or str(c.pk) for c in self.paths[pad.group.parent_id])
+        name = pad.name.replace("/", "_")
+        filename = "{0}/{1}.txt".format(path, name)
+        if filename in used:
+            filename = "{0}/{1}-{2}.txt".format(path, name, pad.pk)
+        used.add(filename)
+        return filename
+
+    def get_categories(self):
+        categories = self.object.get_descendants(include_self=True)
+        if not self.request.user.is_staff:
+            categories = categories.filter(groups__in=self.request.user.groups.all()).distinct()
+        return categories
+
+    def stream(self):
+        self.paths = {}
+        for category in self.object.get_descendants(include_self=True):
+            parent = self.paths.get(category.parent_id, [])
+            self.paths[category.pk] = parent + [category]
+
+        pads = models.Pad.objects.select_related('server', 'group').filter(
+            group__parent__in=self.get_categories(),
+        ).exclude(padid=None)
+        batches = OrderedDict()
+        for pad in pads:
+            batches.setdefault(pad.server_id, []).append(pad)
+
+        used = set()
+        errors = []
+        buffer = ZipStream()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for server_pads in batches.values():
+                client = server_pads[0].server.client
+                for i in range(0, len(server_pads), EXPORT_BATCH_SIZE):
+                    batch = server_pads[i:i + EXPORT_BATCH_SIZE]
+                    texts = client.get_texts([pad.padid for pad in batch])
+                    for pad in batch:
+                        text = texts.get(pad.padid)
+                        if text is None:
+                            errors.append("{0}: {1}".format(pad.name, _("could not fetch the text")))
+                            continue
+                        archive.writestr(self.get_filename(pad, used), text)
+                    yield buffer.drain()
+            if errors:
+                archive.writestr("errors.txt", "\n".join(errors))
+        yield buffer.drain()
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        if not self.get_categories().exists():
+            raise PermissionDenied
+        response = StreamingHttpResponse(self.stream(), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename="{0}.zip"'.format(self.object.slug)
+        return response
+
 class CategorySettingsView(UpdateView):
     model = models.PadCategory
     template_name = 'padman/group-settings.html'
@@ -459,20 +557,21 @@ class PadSettingsView(LoginRequiredMixin, UpdateView):
 @csrf_protect
 def padDuplicate(request, pk):
     pad = get_object_or_404(models.Pad, pk=pk)
+    if not pad.group.is_member(request.user):
+        raise PermissionDenied
     date = datetime.datetime.now()
 
-    client = pad.server.client
-    text = client.get_text(pad.padid)
-    text_template = Template(text)
+    password = templating.render_field(pad.template_password, Context({}))
+    padname = templating.render_field(pad.template_padname, Context({"date": date }))
+    slug = templating.render_field(pad.template_slug, Context({"date": date }))
 
-    pass_template = Template(pad.template_password)
-    password = pass_template.render(Context({}))
-    name_template = Template(pad.template_padname)
-    padname = name_template.render(Context({"date": date }))
-    slug_template = Template(pad.template_slug)
-    slug = slug_template.render(Context({"date": date }))
+    if pad.template_pool_size:
+        new_pad = pool.claim(pad, padname, slug, password)
+        if new_pad:
+            return HttpResponseRedirect(reverse_lazy('padman:pad', args=[new_pad.pk]))
 
-    new_text = text_template.render(Context({
+    client = pad.server.client
+    new_text = templating.pad_template(pad, client).render(Context({
         "password": password,
         "date": date,
         "name": padname,
@@ -13,6 +13,10 @@ setup(
         'Django',
         'PyEtherpadLite',
     ],
+    extras_require={
+        # The async views, see padman/async_urls.py
+        'async': ['httpx'],
+    },
     dependency_links=[
         # The original PyEtherpadLite at
         # https://github.com/devjones/PyEtherpadLite is currently